@@ -1,20 +1,10 @@
-import time
 import uuid
 import json
 import csv
-import random
 from statistics import mean
-from concurrent.futures import ThreadPoolExecutor
-from pymongo import MongoClient
-import requests
-from arango import ArangoClient
-from couchbase.cluster import Cluster
-from couchbase.options import ClusterOptions
-from couchbase.auth import PasswordAuthenticator
-from couchbase.management.buckets import CreateBucketSettings
-from couchbase.exceptions import BucketAlreadyExistsException
-import matplotlib.pyplot as plt
-import pandas as pd
+from workers import OperationSource, run_workers, SKIPPED
+from keyspace import KeySpace
+from startup_timings import import_timer
 
 DOCUMENT_SIZES = [1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 2048, 4096]
 THREADS = 10
@@ -37,69 +27,47 @@ def create_test_doc():
     return doc
 
 def insert_parallel(fn_insert, num_docs, db_name):
-    docs = [create_test_doc() for _ in range(num_docs)]
-
-    start = time.time()
-    with ThreadPoolExecutor(max_workers=THREADS) as executor:
-        futures = [executor.submit(fn_insert, doc) for doc in docs]
-        for future in futures:
-            future.result()
-    total_time = time.time() - start
+    source = OperationSource(num_docs, {"write": 100})
+    run = run_workers(source, {"write": lambda: fn_insert(create_test_doc())}, THREADS)
+    total_time = run["total_time"]
     print(f"[{db_name}] Insert {num_docs} docs done in {total_time:.2f}s")
     return total_time, total_time / num_docs
 
 def read_parallel(fn_read, num_docs, db_name):
-    start = time.time()
-    with ThreadPoolExecutor(max_workers=THREADS) as executor:
-        futures = [executor.submit(fn_read) for _ in range(num_docs)]
-        for future in futures:
-            future.result()
-    total_time = time.time() - start
+    source = OperationSource(num_docs, {"read": 100})
+    run = run_workers(source, {"read": fn_read}, THREADS)
+    total_time = run["total_time"]
     print(f"[{db_name}] Read {num_docs} docs done in {total_time:.2f}s")
     return total_time, total_time / num_docs
 
 def mixed_workload_parallel(fn_insert, fn_read, num_ops, read_pct, write_pct, db_name):
-    read_ops = int(num_ops * (read_pct / 100))
-    write_ops = num_ops - read_ops
+    # Операції видаються робочим потокам по одній, перемішування задає OperationSource
+    source = OperationSource(num_ops, {"read": read_pct, "write": write_pct})
+    handlers = {
+        "write": lambda: fn_insert(create_test_doc()),
+        "read": fn_read
+    }
+    run = run_workers(source, handlers, THREADS)
     
-    ops = []
-    # Підготувати операції запису
-    for _ in range(write_ops):
-        doc = create_test_doc()
-        ops.append(("write", doc))
-    
-    # Підготувати операції читання
-    for _ in range(read_ops):
-        ops.append(("read", None))
-    
-    # Перемішати операції для реалістичнішого навантаження
-    random.shuffle(ops)
-    
-    start = time.time()
-    with ThreadPoolExecutor(max_workers=THREADS) as executor:
-        futures = []
-        for op_type, doc in ops:
-            if op_type == "write":
-                futures.append(executor.submit(fn_insert, doc))
-            else:
-                futures.append(executor.submit(fn_read))
-        
-        for future in futures:
-            future.result()
-    
-    total_time = time.time() - start
+    total_time = run["total_time"]
     print(f"[{db_name}] Mixed workload ({read_pct}% read, {write_pct}% write) - {num_ops} ops done in {total_time:.2f}s")
     return total_time, total_time / num_ops
 
 def benchmark_mongo(num_docs, scenario=None):
+    with import_timer("mongodb"):
+        from pymongo import MongoClient
     print(f"[MongoDB] Connecting...")
     client = MongoClient("mongodb://localhost:27017/")
     db = client.benchmark
     collection = db.test
     collection.delete_many({})  # Clean
 
-    insert_fn = lambda doc: collection.insert_one(doc)
-    read_fn = lambda: list(collection.find({"name": "Test"}))
+    # Обробники run_workers не повертають результатів драйвера
+    def insert_fn(doc):
+        collection.insert_one(doc)
+
+    def read_fn():
+        list(collection.find({"name": "Test"}))
 
     if scenario:
         # Змішане навантаження
@@ -140,6 +108,8 @@ def benchmark_mongo(num_docs, scenario=None):
 #         return insert_time, read_time, avg_insert, avg_read
 
 def benchmark_arango(num_docs, scenario=None):
+    with import_timer("arangodb"):
+        from arango import ArangoClient
     print(f"[ArangoDB] Connecting...")
     client = ArangoClient()
     db = client.db('_system', username='root', password='admin')
@@ -152,8 +122,11 @@ def benchmark_arango(num_docs, scenario=None):
         db.delete_collection('test')
     col = db.create_collection('test')
 
-    insert_fn = lambda doc: col.insert(doc)
-    read_fn = lambda: list(col.find({"name": "Test"}))
+    def insert_fn(doc):
+        col.insert(doc)
+
+    def read_fn():
+        list(col.find({"name": "Test"}))
 
     if scenario:
         # Змішане навантаження
@@ -169,6 +142,12 @@ def benchmark_arango(num_docs, scenario=None):
         return insert_time, read_time, avg_insert, avg_read
 
 def benchmark_couchbase(num_docs, scenario=None):
+    with import_timer("couchbase"):
+        from couchbase.cluster import Cluster
+        from couchbase.options import ClusterOptions
+        from couchbase.auth import PasswordAuthenticator
+        from couchbase.management.buckets import CreateBucketSettings
+        from couchbase.exceptions import BucketAlreadyExistsException
     print(f"[Couchbase] Connecting...")
     cluster = Cluster("couchbase://localhost", ClusterOptions(
         PasswordAuthenticator("admin", "admin123")))
@@ -181,20 +160,21 @@ def benchmark_couchbase(num_docs, scenario=None):
     bucket = cluster.bucket(bucket_name)
     collection = bucket.default_collection()
 
-    inserted_keys = []
+    keys = KeySpace(prefix="couchbase")
 
     def insert(doc):
-        key = str(uuid.uuid4())
-        collection.upsert(key, doc)
-        inserted_keys.append(key)
+        record_id = keys.reserve()
+        collection.upsert(keys.key(record_id), doc)
+        keys.commit(record_id)
 
     def read():
-        if inserted_keys:
-            key = random.choice(inserted_keys)
-            try:
-                collection.get(key)
-            except Exception:
-                pass  # Якщо щось пішло не так — просто ігноруємо
+        key = keys.sample_key()
+        if key is None:
+            return SKIPPED
+        try:
+            collection.get(key)
+        except Exception:
+            pass  # Якщо щось пішло не так — просто ігноруємо
 
     if scenario:
         # Для змішаного навантаження нам потрібно спочатку вставити документи для читання
@@ -224,6 +204,8 @@ def save_results(results, filename="benchmark_pro_results.csv"):
     print(f"\n✅ Results saved to {filename}")
 
 def plot_workload_results(results_df):
+    with import_timer("matplotlib"):
+        import matplotlib.pyplot as plt
     # Створюємо графіки для кожного сценарію навантаження
     scenarios = results_df['Scenario'].unique()
     
@@ -258,6 +240,8 @@ def save_workload_results(results, filename="benchmark_workload_results.csv"):
     print(f"\n✅ Results saved to {filename}")
     
     # Створюємо графіки
+    with import_timer("pandas"):
+        import pandas as pd
     results_df = pd.read_csv(filename, encoding='utf-8')
     plot_workload_results(results_df)
     print("\n✅ Графіки збережено у файли benchmark_*.png")
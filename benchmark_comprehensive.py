@@ -1,30 +1,35 @@
 import time
-import uuid
 import json
 import csv
-import random
 import numpy as np
 import psutil
 import threading
-from concurrent.futures import ThreadPoolExecutor, TimeoutError
-from pymongo import MongoClient
-from arango import ArangoClient
-from couchbase.cluster import Cluster
-from couchbase.options import ClusterOptions
-from couchbase.auth import PasswordAuthenticator
-from couchbase.management.buckets import CreateBucketSettings
-from couchbase.exceptions import BucketAlreadyExistsException
+import itertools
 import argparse
+from datetime import timedelta
+from workers import OperationSource, run_workers, SKIPPED
+from keyspace import KeySpace, KEY_DISTRIBUTIONS
+from docgen import DocumentGenerator, DEFAULT_TYPE_MIX, parse_type_mix
+from latency import LatencyHistogram
+from metrics_server import LiveMetrics, start_metrics_server
+from payloads import PreencodedPayloads
+from server_metrics import (ServerMetricsScraper, save_server_metrics, parse_openmetrics, flatten_couchdb_stats,
+                            ARANGO_METRIC_PREFIXES, COUCHBASE_STATS)
+from startup_timings import import_timer
 
 # Конфігурація
 THREADS = 10
-TIMEOUT = 120  # Таймаут для операцій в секундах
+TIMEOUT = 120  # Таймаут для одного прогону в секундах
+# Таймаут однієї операції драйвера: завислий запит завершується помилкою, а не тримає потік після дедлайну прогону
+OPERATION_TIMEOUT = TIMEOUT / 4
 PAUSE_BETWEEN_EXPERIMENTS = 30  # Пауза між експериментами в секундах
 TEST_DOC = {
     "name": "Test",
     "value": 123,
     "uuid": None,
-    "data": None  # Буде заповнено даними різного розміру
+    "counter": 0,  # Збільшується частковими оновленнями
+    "version": 0,  # Версія для оптимістичного блокування в read-modify-write
+    "data": None  # Буде заповнено згенерованим вкладеним документом заданого розміру
 }
 
 # Сценарії навантаження
@@ -35,7 +40,11 @@ WORKLOAD_SCENARIOS = {
     "read_only": {"read": 100, "write": 0, "description": "100% читання"},
     "write_only": {"read": 0, "write": 100, "description": "100% запису"},
     "batch_write": {"read": 0, "write": 100, "description": "Пакетний запис"},
-    "complex_query": {"read": 100, "write": 0, "description": "Складні запити"}
+    "complex_query": {"read": 100, "write": 0, "description": "Складні запити"},
+    "update_heavy": {"read": 50, "update": 50, "description": "50% читання, 50% часткових оновлень"},
+    "read_modify_write": {"read": 50, "rmw": 50, "description": "50% читання, 50% читання-зміна-запис"},
+    "mixed_mutations": {"read": 40, "write": 10, "replace": 10, "update": 20, "upsert": 10,
+                        "delete": 5, "rmw": 5, "description": "Змішані зміни документів"}
 }
 
 # Розміри документів (в КБ)
@@ -47,71 +56,835 @@ DOCUMENT_SIZES = {
 }
 
 # Доступні бази даних
-AVAILABLE_DATABASES = ["mongodb", "arangodb", "couchbase"]
+AVAILABLE_DATABASES = ["mongodb", "arangodb", "couchbase", "couchdb"]
+
+# Типи операцій, для яких у результатах звітуються окремі затримки:
+# write - вставка нового документа, replace - повна заміна, update - часткове
+# оновлення полів, upsert - вставка або заміна, delete - видалення,
+# rmw - читання-зміна-запис з перевіркою версії (CAS/ревізії)
+OPERATION_TYPES = ["read", "write", "replace", "update", "upsert", "delete", "rmw"]
+
+# Операції, яким потрібні вже вставлені документи
+MUTATION_TYPES = ["replace", "update", "delete", "rmw"]
+
+# Кількість документів, що вставляються перед сценаріями зі змінами, якщо колекція порожня
+PRELOAD_DOCS = 1000
+
+# Максимальна кількість повторів після конфлікту версій
+MAX_CONFLICT_RETRIES = 10
+
+# Кількість різних документів, закодованих заздалегідь у режимі preencode
+PREENCODED_PAYLOADS = 32
+
+# Рівні надійності запису (перший - налаштування драйвера за замовчуванням).
+# Для Couchbase вказано назви DurabilityLevel: SDK імпортується лише при підключенні.
+DURABILITY_LEVELS = {
+    "mongodb": {
+        "default": None,
+        "w1": {"w": 1},
+        "w1_journal": {"w": 1, "j": True},
+        "majority": {"w": "majority"},
+        "majority_journal": {"w": "majority", "j": True}
+    },
+    "arangodb": {
+        "default": None,
+        "wait_for_sync": {"sync": True}
+    },
+    "couchbase": {
+        "none": None,
+        "majority": "MAJORITY",
+        "majority_persist_active": "MAJORITY_AND_PERSIST_TO_ACTIVE",
+        "persist_to_majority": "PERSIST_TO_MAJORITY"
+    },
+    "couchdb": {
+        "default": None,
+        "batch": {"batch": "ok"}
+    }
+}
+
+# Розподіл ключів для операцій читання за замовчуванням
+KEY_DISTRIBUTION = "uniform"
+
+# Налаштування стиснення, які можна змінити з клієнта (перше - значення за замовчуванням).
+# Для ArangoDB стиснення RocksDB задається лише параметрами запуску сервера.
+COMPRESSION_SETTINGS = {
+    "mongodb": ["snappy", "zstd", "zlib", "none"],
+    "arangodb": [None],
+    "couchbase": ["passive", "active", "off"],
+    "couchdb": [None]
+}
+
+# Кількість документів для оцінки логічного обсягу записаних даних
+LOGICAL_SIZE_SAMPLE = 16
+
+def http_session(auth, pool_size=None, timeout=OPERATION_TIMEOUT):
+    """Сесія requests з пулом з'єднань і таймаутом кожного запиту за замовчуванням
+
+    requests не має таймауту сесії, тому він задається в адаптері й діє
+    для всіх запитів, що не передали власний timeout.
+    """
+    import requests
+
+    class TimeoutAdapter(requests.adapters.HTTPAdapter):
+        def send(self, request, **kwargs):
+            if kwargs.get("timeout") is None:
+                kwargs["timeout"] = timeout
+            return super().send(request, **kwargs)
+
+    session = requests.Session()
+    session.auth = auth
+    session.mount("http://", TimeoutAdapter(pool_maxsize=pool_size or THREADS))
+    return session
+
+def get_db_connection(db_name, compression=None, durability=None, pool_size=None, reset=True):
+    """Отримання підключення до бази даних
+
+    insert_fn і read_fn приймають ключ документа; ключі видає спільний
+    реєстр (KeySpace) у run_benchmark. Функції змін (replace_fn, update_fn,
+    upsert_fn, delete_fn, rmw_fn) повертають кількість повторів після
+    конфліктів версій, якщо вони можливі. insert_raw_fn вставляє вже
+    закодований документ (encode_fn, ключ у полі raw_key_field), оминаючи
+    серіалізацію драйвера. scan_fn(batch_size, fields) повертає ітератор по
+    всіх документах колекції, що отримує їх з сервера пакетами по batch_size;
+    fields обмежує документи кількома полями. prepare_scan_fn() створює
+    службові структури для сканування з проєкцією (None, якщо вони не
+    потрібні) і викликається до вимірювань. transaction_fn(read_keys,
+    write_keys, value) читає і оновлює документи в одній транзакції та
+    повертає (кількість повторів, час фіксації) або (повтори, None), якщо
+    транзакцію так і не вдалося зафіксувати; None для баз даних без
+    багатодокументних транзакцій. storage_stats_fn повертає обсяг
+    даних на диску та в пам'яті за статистикою самої бази даних, а
+    connection_stats_fn - кількість клієнтських з'єднань сервера та
+    використану ним пам'ять, server_metrics_fn - внутрішні лічильники
+    ({"counters": ..., "gauges": ...}) для ServerMetricsScraper.
+    multi_read_fn(keys) читає кілька документів одним запитом.
+    change_feed_fn(stop, ready) повертає генератор вставлених документів зі
+    стрічки змін; ready встановлюється після підписки, генератор завершується
+    після встановлення stop. None, якщо стрічка змін недоступна. close_fn закриває всі з'єднання клієнта.
+    pool_size - максимальний розмір пулу з'єднань клієнта (за замовчуванням
+    типовий для драйвера). reset=False підключається до наявних даних
+    без очищення колекції, щоб кілька клієнтів працювали з одними даними.
+    durability - назва рівня надійності запису з DURABILITY_LEVELS.
+    Драйвер імпортується лише для вибраної бази даних.
+    """
+    levels = DURABILITY_LEVELS.get(db_name, {})
+    if durability is not None and durability not in levels:
+        raise ValueError(f"Непідтримуваний рівень надійності для {db_name}: {durability}")
+    durability_options = levels.get(durability)
 
-def get_db_connection(db_name):
-    """Отримання підключення до бази даних"""
     if db_name == "mongodb":
+        with import_timer("mongodb"):
+            from pymongo import MongoClient
+            from pymongo.write_concern import WriteConcern
+            from pymongo.errors import PyMongoError
+            import bson
+            from bson.raw_bson import RawBSONDocument
         print("🔌 Підключення до MongoDB...")
-        client = MongoClient("mongodb://localhost:27017/")
+        timeout_ms = int(OPERATION_TIMEOUT * 1000)
+        client = MongoClient("mongodb://localhost:27017/", socketTimeoutMS=timeout_ms, connectTimeoutMS=timeout_ms,
+                             serverSelectionTimeoutMS=timeout_ms,
+                             **({"maxPoolSize": pool_size} if pool_size else {}))
         db = client.benchmark
+        if compression and reset:
+            # Компресор WiredTiger задається лише при створенні колекції
+            db.drop_collection("test")
+            db.create_collection("test", storageEngine={
+                "wiredTiger": {"configString": f"block_compressor={compression}"}})
         collection = db.test
-        collection.delete_many({})  # Очищення колекції
+        if reset:
+            collection.delete_many({})  # Очищення колекції
+        if durability_options:
+            collection = collection.with_options(write_concern=WriteConcern(**durability_options))
+        
+        def insert(key, doc):
+            doc["_id"] = key
+            collection.insert_one(doc)
+        
+        def insert_raw(key, payload):
+            # RawBSONDocument передається драйверу без повторного кодування
+            collection.insert_one(RawBSONDocument(payload))
+        
+        def read(key):
+            collection.find_one({"_id": key})
+        
+        def multi_read(keys):
+            return list(collection.find({"_id": {"$in": keys}}))
+        
+        def scan(batch_size, fields=None):
+            projection = {field: 1 for field in fields} if fields else None
+            return collection.find({}, projection, batch_size=batch_size)
+        
+        def change_feed(stop, ready):
+            # Change streams потребують replica set; try_next чекає не довше max_await_time_ms
+            with collection.watch([{"$match": {"operationType": "insert"}}], max_await_time_ms=500) as stream:
+                ready.set()
+                while not stop.is_set():
+                    change = stream.try_next()
+                    if change is not None:
+                        yield change["fullDocument"]
+        
+        def replace(key, doc):
+            doc["_id"] = key
+            collection.replace_one({"_id": key}, doc)
+        
+        def update(key, value):
+            collection.update_one({"_id": key}, {"$set": {"value": value}, "$inc": {"counter": 1}})
+        
+        def upsert(key, doc):
+            doc["_id"] = key
+            collection.replace_one({"_id": key}, doc, upsert=True)
+        
+        def delete(key):
+            collection.delete_one({"_id": key})
+        
+        def read_modify_write(key):
+            for retries in range(MAX_CONFLICT_RETRIES):
+                doc = collection.find_one({"_id": key}, {"value": 1, "version": 1})
+                if doc is None:
+                    return retries
+                # Оновлення застосовується лише якщо версія не змінилась після читання
+                result = collection.update_one(
+                    {"_id": key, "version": doc["version"]},
+                    {"$set": {"value": doc["value"] + 1, "version": doc["version"] + 1}})
+                if result.matched_count:
+                    return retries
+            return MAX_CONFLICT_RETRIES
+        
+        # Транзакції потребують replica set; write concern колекції в транзакції
+        # ігнорується, тому рівень надійності задається для всієї транзакції
+        transaction_write_concern = WriteConcern(**durability_options) if durability_options else None
+        
+        def transaction(read_keys, write_keys, value):
+            attempts = 0
+            callback_done = 0.0
+            
+            def callback(session):
+                nonlocal attempts, callback_done
+                attempts += 1
+                for key in read_keys:
+                    collection.find_one({"_id": key}, session=session)
+                for key in write_keys:
+                    collection.update_one({"_id": key}, {"$set": {"value": value}, "$inc": {"counter": 1}},
+                                          session=session)
+                callback_done = time.perf_counter()
+            
+            # with_transaction сам повторює транзакцію після тимчасових помилок
+            # (конфлікт запису), тому повтори рахуються за викликами callback
+            with client.start_session() as session:
+                try:
+                    session.with_transaction(callback, write_concern=transaction_write_concern)
+                except PyMongoError as e:
+                    if not e.has_error_label("TransientTransactionError"):
+                        raise
+                    return attempts - 1, None
+            return attempts - 1, time.perf_counter() - callback_done
+        
+        def storage_stats():
+            stats = next(collection.aggregate([{"$collStats": {"storageStats": {}}}]))["storageStats"]
+            db_stats = db.command("dbStats")
+            cache = client.admin.command("serverStatus")["wiredTiger"]["cache"]
+            creation = stats.get("wiredTiger", {}).get("creationString", "")
+            compressor = next((part.split("=", 1)[1] for part in creation.split(",")
+                               if part.startswith("block_compressor=")), None)
+            return {
+                "storage_bytes": stats.get("storageSize", 0),
+                "index_bytes": stats.get("totalIndexSize", 0),
+                "server_data_bytes": stats.get("size", 0),
+                "memory_bytes": cache.get("bytes currently in the cache", 0),
+                "db_storage_bytes": db_stats.get("storageSize", 0),
+                "compression": compressor or "none"
+            }
+        
+        def server_metrics():
+            status = client.admin.command("serverStatus")
+            cache = status.get("wiredTiger", {}).get("cache", {})
+            counters = {f"opcounters_{name}": value for name, value in status.get("opcounters", {}).items()}
+            for name in ("pages requested from the cache", "pages read into cache", "pages written from cache",
+                         "unmodified pages evicted", "modified pages evicted",
+                         "pages evicted by application threads"):
+                counters["cache_" + name.replace(" ", "_")] = cache.get(name, 0)
+            gauges = {
+                "cache_bytes": cache.get("bytes currently in the cache", 0),
+                "cache_dirty_bytes": cache.get("tracked dirty bytes in the cache", 0),
+                "cache_max_bytes": cache.get("maximum bytes configured", 0),
+                "connections_current": status.get("connections", {}).get("current", 0)
+            }
+            # Квитки WiredTiger: до 7.0 в concurrentTransactions, далі в queues.execution
+            tickets = (status.get("wiredTiger", {}).get("concurrentTransactions")
+                       or status.get("queues", {}).get("execution", {}))
+            for kind in ("read", "write"):
+                gauges[f"tickets_{kind}_out"] = tickets.get(kind, {}).get("out", 0)
+                gauges[f"tickets_{kind}_available"] = tickets.get(kind, {}).get("available", 0)
+            return {"counters": counters, "gauges": gauges}
+        
+        def connection_stats():
+            status = client.admin.command("serverStatus")
+            return {
+                "server_connections": status["connections"]["current"],
+                "server_memory_bytes": status["mem"]["resident"] * 1024 * 1024  # resident у МБ
+            }
         
         return {
-            "insert_fn": lambda doc: collection.insert_one(doc),
-            "read_fn": lambda: list(collection.find({"name": "Test"}))
+            "insert_fn": insert,
+            "insert_raw_fn": insert_raw,
+            "encode_fn": bson.encode,
+            "raw_key_field": "_id",
+            "read_fn": read,
+            "multi_read_fn": multi_read,
+            "replace_fn": replace,
+            "update_fn": update,
+            "upsert_fn": upsert,
+            "delete_fn": delete,
+            "rmw_fn": read_modify_write,
+            "query_fn": lambda: list(collection.find({"name": "Test"})),
+            "scan_fn": scan,
+            "prepare_scan_fn": None,
+            "transaction_fn": transaction,
+            "change_feed_fn": change_feed,
+            "storage_stats_fn": storage_stats,
+            "connection_stats_fn": connection_stats,
+            "server_metrics_fn": server_metrics,
+            "close_fn": client.close
         }
         
     elif db_name == "arangodb":
+        with import_timer("arangodb"):
+            from arango import ArangoClient
+            from arango.http import DefaultHTTPClient
+            from arango.exceptions import (DocumentRevisionError, DocumentReplaceError, DocumentUpdateError,
+                                           TransactionCommitError)
         print("🔌 Підключення до ArangoDB...")
-        client = ArangoClient()
+        http_client = (DefaultHTTPClient(pool_connections=pool_size, pool_maxsize=pool_size)
+                       if pool_size else None)
+        client = ArangoClient(http_client=http_client, request_timeout=OPERATION_TIMEOUT)
         db = client.db('_system', username='root', password='admin')
         
         if not db.has_database('benchmark'):
             db.create_database('benchmark')
         db = client.db('benchmark', username='root', password='admin')
         
-        if db.has_collection('test'):
+        if reset and db.has_collection('test'):
             db.delete_collection('test')
-        col = db.create_collection('test')
+        col = db.collection('test') if db.has_collection('test') else db.create_collection('test')
+        
+        write_options = durability_options or {}
+        update_query = (
+            "FOR d IN test FILTER d._key == @key "
+            "UPDATE d WITH {value: @value, counter: d.counter + 1} IN test "
+            "OPTIONS {waitForSync: @sync}")
+        
+        def insert(key, doc):
+            doc["_key"] = key
+            col.insert(doc, **write_options)
+        
+        # python-arango завжди серіалізує словник, тому готові байти
+        # надсилаються напряму в HTTP API документів
+        raw_session = http_session(("root", "admin"), pool_size)
+        raw_session.headers["Content-Type"] = "application/json"
+        raw_url = "http://localhost:8529/_db/benchmark/_api/document/test"
+        raw_params = {"waitForSync": "true"} if write_options.get("sync") else {}
+        
+        def insert_raw(key, payload):
+            raw_session.post(raw_url, data=payload, params=raw_params).raise_for_status()
+        
+        def read(key):
+            col.get(key)
+        
+        def multi_read(keys):
+            return col.get_many(keys)
+        
+        def scan(batch_size, fields=None):
+            # stream=True: сервер не матеріалізує весь результат перед першим пакетом
+            if fields:
+                return db.aql.execute("FOR d IN test RETURN KEEP(d, @fields)", bind_vars={"fields": fields},
+                                      batch_size=batch_size, stream=True)
+            return db.aql.execute("FOR d IN test RETURN d", batch_size=batch_size, stream=True)
+        
+        def change_feed(stop, ready):
+            # WAL tailing доступний лише на одиночному сервері; довгого опитування немає,
+            # тому порожня відповідь означає коротку паузу перед наступним запитом
+            wal_url = "http://localhost:8529/_db/benchmark/_api/wal"
+            tick = raw_session.get(f"{wal_url}/lastTick").json()["tick"]
+            ready.set()
+            while not stop.is_set():
+                response = raw_session.get(f"{wal_url}/tail", params={"from": tick})
+                response.raise_for_status()
+                last_included = response.headers.get("x-arango-replication-lastincluded", "0")
+                if response.status_code == 204 or last_included == "0":
+                    time.sleep(0.01)
+                    continue
+                tick = last_included
+                for line in response.text.splitlines():
+                    entry = json.loads(line)
+                    # 2300 - вставка або заміна документа
+                    if entry.get("type") == 2300 and entry.get("cname", "test") == "test":
+                        yield entry["data"]
+        
+        def replace(key, doc):
+            doc["_key"] = key
+            try:
+                col.replace(doc, **write_options)
+            except DocumentReplaceError as e:
+                if e.http_code != 404:  # Документ міг бути видалений іншим потоком
+                    raise
+        
+        def update(key, value):
+            db.aql.execute(update_query, bind_vars={
+                "key": key, "value": value, "sync": write_options.get("sync", False)})
+        
+        def upsert(key, doc):
+            doc["_key"] = key
+            col.insert(doc, overwrite=True, **write_options)
+        
+        def delete(key):
+            col.delete(key, ignore_missing=True, **write_options)
+        
+        def read_modify_write(key):
+            for retries in range(MAX_CONFLICT_RETRIES):
+                doc = col.get(key)
+                if doc is None:
+                    return retries
+                try:
+                    # check_rev: оновлення відхиляється, якщо ревізія змінилась після читання
+                    col.update({"_key": key, "_rev": doc["_rev"], "value": doc["value"] + 1,
+                                "version": doc["version"] + 1}, check_rev=True, **write_options)
+                    return retries
+                except DocumentRevisionError:
+                    continue
+                except DocumentUpdateError as e:
+                    if e.http_code == 404:
+                        return retries
+                    raise
+            return MAX_CONFLICT_RETRIES
+        
+        def transaction(read_keys, write_keys, value):
+            for retries in range(MAX_CONFLICT_RETRIES):
+                # Stream transaction: операції надсилаються окремими запитами до фіксації
+                txn = db.begin_transaction(read="test", write="test", sync=write_options.get("sync"))
+                txn_col = txn.collection("test")
+                try:
+                    for key in read_keys:
+                        txn_col.get(key)
+                    for key in write_keys:
+                        txn_col.update({"_key": key, "value": value}, keep_none=False)
+                    started = time.perf_counter()
+                    txn.commit_transaction()
+                    return retries, time.perf_counter() - started
+                except (DocumentUpdateError, TransactionCommitError) as e:
+                    # 409: конфлікт запису з іншою транзакцією, повторюємо з початку
+                    if e.http_code != 409:
+                        txn.abort_transaction()
+                        raise
+                    if txn.transaction_status() == "running":
+                        txn.abort_transaction()
+            return MAX_CONFLICT_RETRIES - 1, None
+        
+        def storage_stats():
+            # figures колекції; documents_size - оцінка RocksDB вже стиснених даних
+            figures = col.statistics()
+            indexes = figures.get("indexes") or {}
+            return {
+                "storage_bytes": figures.get("documents_size", 0),
+                "index_bytes": indexes.get("size", 0),
+                "server_data_bytes": None,
+                "memory_bytes": figures.get("cache_in_use", figures.get("cache_size", 0)),
+                "db_storage_bytes": None,
+                "compression": "server"
+            }
+        
+        def close_arango():
+            client.close()
+            raw_session.close()
+        
+        def server_metrics():
+            response = raw_session.get("http://localhost:8529/_admin/metrics/v2")
+            response.raise_for_status()
+            return parse_openmetrics(response.text, ARANGO_METRIC_PREFIXES)
+        
+        def connection_stats():
+            # Статистика сервера доступна лише в базі _system
+            stats = raw_session.get("http://localhost:8529/_admin/statistics").json()
+            return {
+                "server_connections": stats["client"]["httpConnections"],
+                "server_memory_bytes": stats["system"]["residentSize"]
+            }
         
         return {
-            "insert_fn": lambda doc: col.insert(doc),
-            "read_fn": lambda: list(col.find({"name": "Test"}))
+            "insert_fn": insert,
+            "insert_raw_fn": insert_raw,
+            "encode_fn": lambda doc: json.dumps(doc).encode("utf-8"),
+            "raw_key_field": "_key",
+            "read_fn": read,
+            "multi_read_fn": multi_read,
+            "replace_fn": replace,
+            "update_fn": update,
+            "upsert_fn": upsert,
+            "delete_fn": delete,
+            "rmw_fn": read_modify_write,
+            "query_fn": lambda: list(col.find({"name": "Test"})),
+            "scan_fn": scan,
+            "prepare_scan_fn": None,
+            "transaction_fn": transaction,
+            "change_feed_fn": change_feed,
+            "storage_stats_fn": storage_stats,
+            "connection_stats_fn": connection_stats,
+            "server_metrics_fn": server_metrics,
+            "close_fn": close_arango
         }
         
     elif db_name == "couchbase":
+        with import_timer("couchbase"):
+            import requests
+            from couchbase.cluster import Cluster
+            from couchbase.options import (ClusterOptions, ClusterTimeoutOptions, UpsertOptions, ReplaceOptions,
+                                           RemoveOptions, MutateInOptions)
+            import couchbase.subdocument as SD
+            from couchbase.transcoder import RawJSONTranscoder
+            from couchbase.durability import ServerDurability, DurabilityLevel
+            from couchbase.auth import PasswordAuthenticator
+            from couchbase.management.buckets import CreateBucketSettings, BucketSettings, CompressionMode
+            from couchbase.exceptions import (BucketAlreadyExistsException, CasMismatchException,
+                                              DocumentNotFoundException)
         print("🔌 Підключення до Couchbase...")
+        operation_timeout = timedelta(seconds=OPERATION_TIMEOUT)
         cluster = Cluster("couchbase://localhost", ClusterOptions(
-            PasswordAuthenticator("admin", "admin123")))
+            PasswordAuthenticator("admin", "admin123"),
+            timeout_options=ClusterTimeoutOptions(kv_timeout=operation_timeout, kv_durable_timeout=operation_timeout,
+                                                  query_timeout=operation_timeout)))
         bucket_name = "benchmark"
         try:
             cluster.buckets().create_bucket(CreateBucketSettings(name=bucket_name, ram_quota_mb=100))
         except BucketAlreadyExistsException:
             pass
         
+        if compression:
+            try:
+                cluster.buckets().update_bucket(BucketSettings(
+                    name=bucket_name, ram_quota_mb=100,
+                    compression_mode=CompressionMode(compression)))
+            except Exception as e:
+                # Community Edition не підтримує зміну режиму стиснення
+                print(f"⚠️ Не вдалося встановити стиснення Couchbase {compression}: {str(e)}")
+        
         bucket = cluster.bucket(bucket_name)
         collection = bucket.default_collection()
         
-        inserted_keys = []
+        durability_kwargs = ({"durability": ServerDurability(getattr(DurabilityLevel, durability_options))}
+                             if durability_options else {})
+        upsert_options = UpsertOptions(**durability_kwargs)
+        replace_options = ReplaceOptions(**durability_kwargs)
+        remove_options = RemoveOptions(**durability_kwargs)
+        mutate_options = MutateInOptions(**durability_kwargs)
+        # RawJSONTranscoder передає готові JSON-байти без серіалізації
+        raw_upsert_options = UpsertOptions(transcoder=RawJSONTranscoder(), **durability_kwargs)
+        
+        def insert(key, doc):
+            collection.upsert(key, doc, upsert_options)
+        
+        def insert_raw(key, payload):
+            collection.upsert(key, payload, raw_upsert_options)
+        
+        def read(key):
+            try:
+                collection.get(key)
+            except Exception:
+                pass
+        
+        def multi_read(keys):
+            # get_multi надсилає всі запити паралельно; відсутні ключі повертаються як помилки в результаті
+            return collection.get_multi(keys)
+        
+        def prepare_scan():
+            # Первинний індекс для посторінкового N1QL-сканування з проєкцією
+            cluster.query(f"CREATE PRIMARY INDEX IF NOT EXISTS ON `{bucket_name}`").execute()
+        
+        def scan(batch_size, fields=None):
+            if fields:
+                # Проєкцію підтримує лише N1QL: посторінково за META().id з первинним індексом (prepare_scan)
+                from couchbase.options import QueryOptions
+                select = ", ".join(f"`{field}`" for field in fields)
+                query = (f"SELECT META().id AS id, {select} FROM `{bucket_name}` "
+                         f"WHERE META().id > $last ORDER BY META().id LIMIT {batch_size}")
+                last = ""
+                while True:
+                    rows = list(cluster.query(query, QueryOptions(named_parameters={"last": last})))
+                    if not rows:
+                        return
+                    yield from rows
+                    last = rows[-1]["id"]
+            else:
+                # KV range scan (Couchbase Server 7.6+) без службового запиту
+                from couchbase.kv_range_scan import RangeScan
+                from couchbase.options import ScanOptions
+                for result in collection.scan(RangeScan(), ScanOptions(batch_item_limit=batch_size)):
+                    yield result.content_as[dict]
+        
+        def replace(key, doc):
+            try:
+                collection.replace(key, doc, replace_options)
+            except DocumentNotFoundException:
+                pass
         
-        def insert(doc):
-            key = str(uuid.uuid4())
-            collection.upsert(key, doc)
-            inserted_keys.append(key)
+        def update(key, value):
+            # Підокументна зміна: сервер змінює лише вказані шляхи
+            try:
+                collection.mutate_in(key, [SD.upsert("value", value), SD.increment("counter", 1)],
+                                     mutate_options)
+            except DocumentNotFoundException:
+                pass
         
-        def read():
-            if inserted_keys:
-                key = random.choice(inserted_keys)
+        def delete(key):
+            try:
+                collection.remove(key, remove_options)
+            except DocumentNotFoundException:
+                pass
+        
+        def read_modify_write(key):
+            for retries in range(MAX_CONFLICT_RETRIES):
+                try:
+                    result = collection.get(key)
+                except DocumentNotFoundException:
+                    return retries
+                doc = result.content_as[dict]
+                doc["value"] += 1
+                doc["version"] += 1
                 try:
-                    collection.get(key)
-                except Exception:
-                    pass
+                    collection.replace(key, doc, ReplaceOptions(cas=result.cas, **durability_kwargs))
+                    return retries
+                except CasMismatchException:
+                    continue
+                except DocumentNotFoundException:
+                    return retries
+            return MAX_CONFLICT_RETRIES
+        
+        def storage_stats():
+            response = requests.get(f"http://localhost:8091/pools/default/buckets/{bucket_name}",
+                                    auth=("admin", "admin123"), timeout=OPERATION_TIMEOUT)
+            response.raise_for_status()
+            info = response.json()
+            basic = info.get("basicStats", {})
+            return {
+                "storage_bytes": basic.get("diskUsed", 0),
+                "index_bytes": None,
+                "server_data_bytes": basic.get("dataUsed", 0),
+                "memory_bytes": basic.get("memUsed", 0),
+                "db_storage_bytes": None,
+                "compression": info.get("compressionMode", "unknown")
+            }
+        
+        def server_metrics():
+            # Зразки статистики бакета вже є посекундними значеннями, тому всі вони - показники
+            samples = requests.get(f"http://localhost:8091/pools/default/buckets/{bucket_name}/stats",
+                                   auth=("admin", "admin123"), timeout=OPERATION_TIMEOUT).json()["op"]["samples"]
+            return {"counters": {}, "gauges": {name: samples[name][-1] for name in COUCHBASE_STATS
+                                               if samples.get(name)}}
+        
+        def connection_stats():
+            # curr_connections рахує з'єднання memcached (KV) на вузлі;
+            # пам'ять процесу memcached окремо не публікується, тому береться пам'ять вузла
+            auth = ("admin", "admin123")
+            samples = requests.get(f"http://localhost:8091/pools/default/buckets/{bucket_name}/stats",
+                                   auth=auth, timeout=OPERATION_TIMEOUT).json()["op"]["samples"]
+            nodes = requests.get("http://localhost:8091/pools/default", auth=auth,
+                                 timeout=OPERATION_TIMEOUT).json()["nodes"]
+            return {
+                "server_connections": samples["curr_connections"][-1],
+                "server_memory_bytes": sum(node["systemStats"]["mem_total"] - node["systemStats"]["mem_free"]
+                                           for node in nodes)
+            }
+        
+        return {
+            "insert_fn": insert,
+            "insert_raw_fn": insert_raw,
+            "encode_fn": lambda doc: json.dumps(doc).encode("utf-8"),
+            "raw_key_field": None,
+            "read_fn": read,
+            "multi_read_fn": multi_read,
+            "replace_fn": replace,
+            "update_fn": update,
+            "upsert_fn": insert,
+            "delete_fn": delete,
+            "rmw_fn": read_modify_write,
+            # Без N1QL-індексу складний запит для Couchbase зводиться до читання за ключем
+            "query_fn": None,
+            "scan_fn": scan,
+            "prepare_scan_fn": prepare_scan,
+            "transaction_fn": None,
+            "change_feed_fn": None,  # DCP недоступний у Python SDK
+            "storage_stats_fn": storage_stats,
+            "connection_stats_fn": connection_stats,
+            "server_metrics_fn": server_metrics,
+            "close_fn": cluster.close
+        }
+    
+    elif db_name == "couchdb":
+        with import_timer("couchdb"):
+            import requests
+        print("🔌 Підключення до CouchDB...")
+        base_url = "http://localhost:5984/benchmark"
+        session = http_session(("admin", "admin"), pool_size)
+        if reset:
+            session.delete(base_url)  # Очищення бази
+            session.put(base_url).raise_for_status()
+        elif session.head(base_url).status_code == 404:
+            session.put(base_url).raise_for_status()
+        write_params = durability_options or {}
+        
+        def insert(key, doc):
+            session.put(f"{base_url}/{key}", json=doc, params=write_params).raise_for_status()
+        
+        def insert_raw(key, payload):
+            session.put(f"{base_url}/{key}", data=payload, params=write_params,
+                        headers={"Content-Type": "application/json"}).raise_for_status()
+        
+        def read(key):
+            session.get(f"{base_url}/{key}")
+        
+        def multi_read(keys):
+            response = session.post(f"{base_url}/_all_docs", params={"include_docs": "true"}, json={"keys": keys})
+            response.raise_for_status()
+            return response.json()["rows"]
+        
+        def scan(batch_size, fields=None):
+            if fields:
+                # _find з bookmark повертає лише вказані поля
+                bookmark = None
+                while True:
+                    body = {"selector": {"_id": {"$gt": None}}, "fields": fields, "limit": batch_size}
+                    if bookmark:
+                        body["bookmark"] = bookmark
+                    page = session.post(f"{base_url}/_find", json=body).json()
+                    docs = page.get("docs", [])
+                    if not docs:
+                        return
+                    yield from docs
+                    bookmark = page.get("bookmark")
+            else:
+                # Посторінкове _all_docs: зайвий рядок сторінки дає startkey наступної
+                startkey = None
+                while True:
+                    params = {"include_docs": "true", "limit": batch_size + 1}
+                    if startkey is not None:
+                        params["startkey"] = json.dumps(startkey)
+                    rows = session.get(f"{base_url}/_all_docs", params=params).json()["rows"]
+                    for row in rows[:batch_size]:
+                        yield row["doc"]
+                    if len(rows) <= batch_size:
+                        return
+                    startkey = rows[batch_size]["id"]
+        
+        def change_feed(stop, ready):
+            # Окрема сесія: потокова відповідь тримає з'єднання весь час читання;
+            # таймаут діє на паузу між рядками, яку heartbeat обмежує однією секундою
+            feed_session = http_session(session.auth, 1)
+            params = {"feed": "continuous", "include_docs": "true", "since": "now", "heartbeat": 1000}
+            with feed_session.get(f"{base_url}/_changes", params=params, stream=True) as response:
+                response.raise_for_status()
+                ready.set()
+                # Стрічка передається chunked-кодуванням, тому кожен chunk віддається одразу;
+                # порожні рядки heartbeat дозволяють перевіряти stop без нових змін
+                for line in response.iter_lines(chunk_size=8192):
+                    if stop.is_set():
+                        break
+                    if line:
+                        change = json.loads(line)
+                        if "doc" in change and not change.get("deleted"):
+                            yield change["doc"]
+            feed_session.close()
+        
+        def write_with_rev(key, modify, create=False):
+            """Запис з поточною ревізією; 409 означає конфлікт і повтор.
+
+            CouchDB не має часткових оновлень без design-документів, тому
+            replace, update і rmw читають ревізію перед записом.
+            """
+            url = f"{base_url}/{key}"
+            for retries in range(MAX_CONFLICT_RETRIES):
+                response = session.get(url)
+                if response.status_code == 404:
+                    if not create:
+                        return retries
+                    current = None
+                else:
+                    response.raise_for_status()
+                    current = response.json()
+                doc = modify(current)
+                if current is not None:
+                    doc["_rev"] = current["_rev"]
+                put = session.put(url, json=doc, params=write_params)
+                if put.status_code == 409:
+                    continue
+                put.raise_for_status()
+                return retries
+            return MAX_CONFLICT_RETRIES
+        
+        def update_fields(current, value):
+            current["value"] = value
+            current["counter"] += 1
+            return current
+        
+        def increment_version(current):
+            current["value"] += 1
+            current["version"] += 1
+            return current
+        
+        def delete(key):
+            url = f"{base_url}/{key}"
+            for retries in range(MAX_CONFLICT_RETRIES):
+                head = session.head(url)
+                if head.status_code == 404:
+                    return retries
+                response = session.delete(url, params={"rev": head.headers["ETag"].strip('"'), **write_params})
+                if response.status_code != 409:
+                    return retries
+            return MAX_CONFLICT_RETRIES
+        
+        def storage_stats():
+            info = session.get(base_url).json()
+            sizes = info.get("sizes", {})
+            return {
+                "storage_bytes": sizes.get("file", 0),
+                "index_bytes": None,
+                "server_data_bytes": sizes.get("external", 0),
+                "memory_bytes": None,
+                "db_storage_bytes": None,
+                "compression": "server"
+            }
+        
+        def server_metrics():
+            stats = session.get("http://localhost:5984/_node/_local/_stats/couchdb").json()
+            return flatten_couchdb_stats(stats, "couchdb.")
+        
+        def connection_stats():
+            # CouchDB не публікує кількість HTTP-з'єднань; пам'ять - загальна пам'ять Erlang VM
+            memory = session.get("http://localhost:5984/_node/_local/_system").json()["memory"]
+            return {
+                "server_connections": None,
+                "server_memory_bytes": sum(memory.get(part, 0) for part in
+                                           ("processes", "atom", "binary", "code", "ets", "other"))
+            }
         
         return {
             "insert_fn": insert,
-            "read_fn": read
+            "insert_raw_fn": insert_raw,
+            "encode_fn": lambda doc: json.dumps(doc).encode("utf-8"),
+            "raw_key_field": None,
+            "read_fn": read,
+            "multi_read_fn": multi_read,
+            "replace_fn": lambda key, doc: write_with_rev(key, lambda current: doc),
+            "update_fn": lambda key, value: write_with_rev(key, lambda current: update_fields(current, value)),
+            "upsert_fn": lambda key, doc: write_with_rev(key, lambda current: doc, create=True),
+            "delete_fn": delete,
+            "rmw_fn": lambda key: write_with_rev(key, increment_version),
+            "query_fn": lambda: session.get(f"{base_url}/_all_docs", params={"include_docs": "true"}),
+            "scan_fn": scan,
+            "prepare_scan_fn": None,
+            "transaction_fn": None,
+            "change_feed_fn": change_feed,
+            "storage_stats_fn": storage_stats,
+            "connection_stats_fn": connection_stats,
+            "server_metrics_fn": server_metrics,
+            "close_fn": session.close
         }
     else:
         raise ValueError(f"Непідтримувана база даних: {db_name}")
@@ -126,7 +899,7 @@ class SystemMetrics:
     def start(self):
         """Запуск збору метрик"""
         self.running = True
-        self.thread = threading.Thread(target=self._collect_metrics)
+        self.thread = threading.Thread(target=self._collect_metrics, daemon=True)
         self.thread.start()
 
     def stop(self):
@@ -162,23 +935,159 @@ class SystemMetrics:
             "avg_net_recv": np.mean([m["net_io"].bytes_recv for m in self.metrics])
         }
 
-def create_test_doc(size_kb):
-    """Створення тестового документа заданого розміру"""
+def create_test_doc(size_kb, record_id, generator):
+    """Створення тестового документа заданого розміру
+
+    Вміст детерміновано визначається seed генератора та ідентифікатором запису.
+    """
     doc = TEST_DOC.copy()
-    doc["uuid"] = str(uuid.uuid4())
-    # Генерація даних заданого розміру
-    doc["data"] = "x" * (size_kb * 1024)  # Конвертуємо КБ в байти
+    doc["uuid"] = generator.document_uuid(record_id)
+    doc["data"] = generator.generate(record_id, size_kb * 1024)  # Конвертуємо КБ в байти
     return doc
 
+def collect_storage_report(db_connection, keys, doc_size, generator):
+    """Обсяг даних на диску та в пам'яті відносно логічно записаних байтів
+
+    Логічний обсяг оцінюється як кількість живих записів, помножена на
+    середній розмір JSON кількох документів генератора.
+    """
+    try:
+        stats = db_connection["storage_stats_fn"]()
+    except Exception as e:
+        print(f"⚠️ Не вдалося отримати статистику зберігання: {str(e)}")
+        stats = {"compression": None, "storage_bytes": None, "index_bytes": None,
+                 "server_data_bytes": None, "memory_bytes": None}
+    
+    sample = [create_test_doc(doc_size["size"], record_id, generator)
+              for record_id in range(LOGICAL_SIZE_SAMPLE)]
+    avg_doc_bytes = np.mean([len(json.dumps(doc)) for doc in sample])
+    logical_bytes = keys.live_count() * avg_doc_bytes
+    
+    on_disk = (stats["storage_bytes"] or 0) + (stats["index_bytes"] or 0)
+    report = {
+        "compression": stats["compression"],
+        "logical_bytes": logical_bytes,
+        "storage_bytes": stats["storage_bytes"],
+        "index_bytes": stats["index_bytes"],
+        "server_data_bytes": stats["server_data_bytes"],
+        "memory_bytes": stats["memory_bytes"],
+        # Скільки байтів на диску припадає на один логічний байт (з індексами)
+        "space_amplification": on_disk / logical_bytes if logical_bytes else None,
+        # Логічний обсяг відносно обсягу даних на диску (без індексів)
+        "compression_ratio": logical_bytes / stats["storage_bytes"] if stats["storage_bytes"] else None
+    }
+    return report
+
+def build_preencoded_payloads(db_connection, keys, doc_size, generator):
+    """Кодування PREENCODED_PAYLOADS документів один раз перед прогоном"""
+    docs = [create_test_doc(doc_size["size"], record_id, generator)
+            for record_id in range(PREENCODED_PAYLOADS)]
+    return PreencodedPayloads(docs, db_connection["encode_fn"], db_connection["raw_key_field"],
+                              keys.key_length())
+
+def scenario_mix(scenario):
+    """Відсотки типів операцій сценарію"""
+    return {op_type: scenario[op_type] for op_type in OPERATION_TYPES if scenario.get(op_type)}
+
+def build_operation_handlers(db_connection, keys, doc_size, generator, payloads=None):
+    """Обробники операцій без аргументів для run_workers
+
+    Обробники вибирають ключі зі спільного реєстру і підтримують його стан:
+    вставки додають записи, видалення позначають їх видаленими. Якщо живого
+    ключа немає, обробник повертає SKIPPED і операція не враховується.
+    payloads: PreencodedPayloads для вставки заздалегідь закодованих документів.
+    """
+    replacement_ids = itertools.count(1 << 40)  # Інший вміст для повної заміни документа
+    update_values = itertools.count()
+    
+    def write():
+        record_id = keys.reserve()
+        db_connection["insert_fn"](keys.key(record_id), create_test_doc(doc_size["size"], record_id, generator))
+        keys.commit(record_id)
+    
+    def write_preencoded():
+        record_id = keys.reserve()
+        key = keys.key(record_id)
+        db_connection["insert_raw_fn"](key, payloads.payload(key, record_id))
+        keys.commit(record_id)
+    
+    def read():
+        key = keys.sample_key()
+        if key is None:
+            return SKIPPED
+        db_connection["read_fn"](key)
+    
+    def replace():
+        key = keys.sample_key()
+        if key is None:
+            return SKIPPED
+        doc = create_test_doc(doc_size["size"], next(replacement_ids), generator)
+        return db_connection["replace_fn"](key, doc)
+    
+    def update():
+        key = keys.sample_key()
+        if key is None:
+            return SKIPPED
+        return db_connection["update_fn"](key, next(update_values))
+    
+    def upsert():
+        record_id = keys.sample()
+        if record_id is None:
+            record_id = keys.reserve()
+        doc = create_test_doc(doc_size["size"], next(replacement_ids), generator)
+        retries = db_connection["upsert_fn"](keys.key(record_id), doc)
+        keys.commit(record_id)
+        return retries
+    
+    def delete():
+        record_id = keys.sample()
+        if record_id is None:
+            return SKIPPED
+        # Запис виключається з вибірки до видалення, щоб інші потоки його не читали
+        keys.delete(record_id)
+        return db_connection["delete_fn"](keys.key(record_id))
+    
+    def read_modify_write():
+        key = keys.sample_key()
+        if key is None:
+            return SKIPPED
+        return db_connection["rmw_fn"](key)
+    
+    return {
+        "read": read,
+        "write": write_preencoded if payloads is not None else write,
+        "replace": replace,
+        "update": update,
+        "upsert": upsert,
+        "delete": delete,
+        "rmw": read_modify_write
+    }
+
 def generate_document_sizes(max_docs):
     """Генерація масиву розмірів документів з 10 кроками"""
     return np.geomspace(1000, max_docs, 10, dtype=int)
 
-def run_benchmark(db_name, scenario_name, max_docs, doc_size):
-    """Запуск комплексного бенчмарку"""
+def run_benchmark(db_name, scenario_name, max_docs, doc_size, key_distribution=KEY_DISTRIBUTION,
+                  generator=None, compression=None, durability=None, live=None, preencode=False):
+    """Запуск комплексного бенчмарку
+
+    live: необов'язковий LiveMetrics для ендпоінта OpenMetrics.
+    preencode: вставляти заздалегідь закодовані документи, щоб виключити
+    з вимірювань побудову та серіалізацію документів на клієнті.
+    """
+    if generator is None:
+        generator = DocumentGenerator()
     print(f"\n🚀 Запуск бенчмарку для {db_name}")
     print(f"📊 Сценарій: {scenario_name}")
     print(f"📦 Розмір документу: {doc_size['description']}")
+    print(f"🔑 Розподіл ключів: {key_distribution}")
+    print(f"🧬 Генератор документів: {generator.describe()}")
+    if compression:
+        print(f"🗜️ Стиснення: {compression}")
+    if durability:
+        print(f"🛡️ Надійність запису: {durability}")
+    if preencode:
+        print(f"📦 Попередньо закодовані документи: {PREENCODED_PAYLOADS}")
     
     scenario = WORKLOAD_SCENARIOS[scenario_name]
     results = []
@@ -191,9 +1100,19 @@ def run_benchmark(db_name, scenario_name, max_docs, doc_size):
     system_metrics = SystemMetrics()
     
     # Отримання підключення до БД
-    db_connection = get_db_connection(db_name)
-    insert_fn = lambda doc: db_connection["insert_fn"](doc)
-    read_fn = db_connection["read_fn"]
+    keys = KeySpace(prefix=db_name, distribution=key_distribution)
+    db_connection = get_db_connection(db_name, compression, durability)
+    payloads = build_preencoded_payloads(db_connection, keys, doc_size, generator) if preencode else None
+    operations = build_operation_handlers(db_connection, keys, doc_size, generator, payloads)
+    # Внутрішня статистика сервера по інтервалах, поруч із часовою лінією клієнта
+    server_metrics = ServerMetricsScraper(db_connection)
+    server_rows = []
+    if scenario_name == "complex_query" and db_connection["query_fn"]:
+        query_fn = db_connection["query_fn"]
+
+        def query():
+            query_fn()  # Результат запиту не є кількістю повторів
+        operations["read"] = query
     
     # Запуск тестування для кожного розміру набору
     for num_docs in doc_sizes:
@@ -201,86 +1120,91 @@ def run_benchmark(db_name, scenario_name, max_docs, doc_size):
         
         # Запуск збору метрик
         system_metrics.start()
+        if live is not None:
+            cell_id = "/".join(str(part) for part in (
+                db_name, scenario_name, doc_size["description"], compression or "default",
+                durability or "default", num_docs))
+            live.begin_cell(cell_id, system_metrics)
         
-        # Підготовка документів
-        docs = [create_test_doc(doc_size["size"]) for _ in range(num_docs)]
+        # Операції видаються довгоживучим робочим потокам по одній,
+        # тому документи створюються лише в момент запису
+        if scenario_name == "batch_write":
+            mix = {"write": 100}
+        elif scenario_name == "complex_query":
+            mix = {"read": 100}
+        else:
+            mix = scenario_mix(scenario)
+        handlers = {op_type: operations[op_type] for op_type in mix}
         
-        # Вимірювання часу
-        start_time = time.time()
-        timeout_occurred = False
+        # Сценаріям з читанням і змінами потрібні документи; попереднє завантаження не вимірюється
+        if keys.count() == 0 and any(op_type in MUTATION_TYPES or op_type == "read" for op_type in mix):
+            preload = min(num_docs, PRELOAD_DOCS)
+            print(f"📥 Попереднє завантаження {preload} документів...")
+            run_workers(OperationSource(preload, {"write": 100}), {"write": operations["write"]}, THREADS)
         
-        try:
-            with ThreadPoolExecutor(max_workers=THREADS) as executor:
-                if scenario_name == "batch_write":
-                    # Пакетний запис
-                    futures = [executor.submit(insert_fn, doc) for doc in docs]
-                    for future in futures:
-                        future.result(timeout=TIMEOUT)
-                elif scenario_name == "complex_query":
-                    # Складні запити
-                    futures = [executor.submit(read_fn) for _ in range(num_docs)]
-                    for future in futures:
-                        future.result(timeout=TIMEOUT)
-                else:
-                    # Звичайне змішане навантаження
-                    read_ops = int(num_docs * (scenario["read"] / 100))
-                    write_ops = num_docs - read_ops
-                    
-                    ops = []
-                    for _ in range(write_ops):
-                        doc = create_test_doc(doc_size["size"])
-                        ops.append(("write", doc))
-                    
-                    for _ in range(read_ops):
-                        ops.append(("read", None))
-                    
-                    random.shuffle(ops)
-                    
-                    futures = []
-                    for op_type, doc in ops:
-                        if op_type == "write":
-                            futures.append(executor.submit(insert_fn, doc))
-                        else:
-                            futures.append(executor.submit(read_fn))
-                    
-                    for future in futures:
-                        future.result(timeout=TIMEOUT)
-        
-        except TimeoutError:
-            print(f"⚠️ Таймаут при виконанні операцій з {num_docs} документами")
-            timeout_occurred = True
-        
-        total_time = time.time() - start_time
+        # Інтервали сервера охоплюють лише вимірюваний прогін, без попереднього завантаження
+        server_metrics.start()
+        run = run_workers(OperationSource(num_docs, mix), handlers, THREADS, timeout=TIMEOUT,
+                          live=[live, server_metrics])
+        total_time = run["total_time"]
+        completed_ops = run["completed_ops"]
+        timeout_occurred = run["timed_out"]
+        if timeout_occurred:
+            print(f"⚠️ Таймаут при виконанні операцій з {num_docs} документами: "
+                  f"виконано {completed_ops} операцій")
         
         # Зупинка збору метрик
         system_metrics.stop()
+        server_metrics.stop()
+        server_rows.extend({"documents": num_docs, **row} for row in server_metrics.rows)
         avg_metrics = system_metrics.get_average_metrics()
         
         # Розрахунок метрик
-        if timeout_occurred:
-            throughput = 0
-            avg_latency = TIMEOUT
-        else:
-            throughput = num_docs / total_time
-            avg_latency = total_time / num_docs
+        # При таймауті враховуються лише завершені операції
+        throughput = completed_ops / total_time if total_time else 0
+        avg_latency = total_time / completed_ops if completed_ops else TIMEOUT
+        
+        # Затримки: загальні перцентилі та окремо для кожного типу операцій
+        latency = LatencyHistogram()
+        for histogram in run["latency"].values():
+            latency.merge(histogram)
+        latency_report = latency.summary()
+        for op_type in OPERATION_TYPES:
+            histogram = run["latency"].get(op_type, LatencyHistogram())
+            latency_report[f"{op_type}_ops"] = histogram.count
+            latency_report[f"{op_type}_p50_latency"] = histogram.percentile(50)
+            latency_report[f"{op_type}_p99_latency"] = histogram.percentile(99)
+            latency_report[f"{op_type}_retries"] = run["retries"].get(op_type, 0)
+            latency_report[f"{op_type}_skipped"] = run["skipped"].get(op_type, 0)
+        
+        # Обсяг даних після прогону (статистика сервера може трохи відставати від запису)
+        storage = collect_storage_report(db_connection, keys, doc_size, generator)
         
         results.append({
             "database": db_name,
             "scenario": scenario_name,
             "document_size": doc_size["description"],
             "documents": num_docs,
+            "completed_ops": completed_ops,
             "total_time": total_time,
             "throughput": throughput,
             "avg_latency": avg_latency,
-            "read_percentage": scenario["read"],
-            "write_percentage": scenario["write"],
+            "read_percentage": scenario.get("read", 0),
+            "write_percentage": scenario.get("write", 0),
+            "operation_mix": ",".join(f"{op_type}={pct}" for op_type, pct in mix.items()),
+            "key_distribution": key_distribution,
+            "doc_generator": generator.describe(),
+            "durability": durability or next(iter(DURABILITY_LEVELS[db_name])),
+            "preencoded": preencode,
+            **latency_report,
             "avg_cpu": avg_metrics["avg_cpu"],
             "avg_memory": avg_metrics["avg_memory"],
             "avg_disk_read": avg_metrics["avg_disk_read"],
             "avg_disk_write": avg_metrics["avg_disk_write"],
             "avg_net_sent": avg_metrics["avg_net_sent"],
             "avg_net_recv": avg_metrics["avg_net_recv"],
-            "timeout_occurred": timeout_occurred
+            "timeout_occurred": timeout_occurred,
+            **storage
         })
         
         # Пауза між експериментами
@@ -289,30 +1213,135 @@ def run_benchmark(db_name, scenario_name, max_docs, doc_size):
             time.sleep(PAUSE_BETWEEN_EXPERIMENTS)
     
     # Збереження результатів
-    filename = f"benchmark_{db_name}_{scenario_name}_{doc_size['size']}kb.csv"
+    suffix = "".join(f"_{part}" for part in (compression, durability, preencode and "preencoded") if part)
+    filename = f"benchmark_{db_name}_{scenario_name}_{doc_size['size']}kb{suffix}.csv"
     with open(filename, mode="w", newline='', encoding='utf-8') as file:
         writer = csv.DictWriter(file, fieldnames=results[0].keys())
         writer.writeheader()
         writer.writerows(results)
     print(f"\n✅ Результати збережено у файл {filename}")
+    save_server_metrics(server_rows, f"server_metrics_{db_name}_{scenario_name}_{doc_size['size']}kb{suffix}.csv")
     
     return results
 
-def run_all_benchmarks():
-    """Запуск всіх бенчмарків для всіх баз даних"""
+def save_durability_cost(all_results, filename="benchmark_durability_cost.csv"):
+    """Вартість кожного рівня надійності відносно рівня за замовчуванням
+
+    Для кожної комбінації бази, сценарію, розміру документа, стиснення та
+    кількості операцій порівнює пропускну здатність і p99 з першим рівнем
+    з DURABILITY_LEVELS.
+    """
+    baselines = {}
+    for row in all_results:
+        if row["durability"] == next(iter(DURABILITY_LEVELS[row["database"]])):
+            cell = (row["database"], row["scenario"], row["document_size"], row["compression"],
+                    row["preencoded"], row["documents"])
+            baselines[cell] = row
+    
+    cost_rows = []
+    for row in all_results:
+        cell = (row["database"], row["scenario"], row["document_size"], row["compression"],
+                row["preencoded"], row["documents"])
+        base = baselines.get(cell)
+        if base is None:
+            continue
+        cost_rows.append({
+            "database": row["database"],
+            "scenario": row["scenario"],
+            "document_size": row["document_size"],
+            "compression": row["compression"],
+            "documents": row["documents"],
+            "durability": row["durability"],
+            "throughput": row["throughput"],
+            "throughput_ratio": row["throughput"] / base["throughput"] if base["throughput"] else None,
+            "write_p99_latency": row["write_p99_latency"],
+            "write_p99_delta": (row["write_p99_latency"] - base["write_p99_latency"]
+                                if row["write_p99_latency"] is not None and base["write_p99_latency"] is not None
+                                else None),
+            "p999_latency": row["p999_latency"]
+        })
+    
+    if not cost_rows:
+        return
+    with open(filename, mode="w", newline='', encoding='utf-8') as file:
+        writer = csv.DictWriter(file, fieldnames=cost_rows[0].keys())
+        writer.writeheader()
+        writer.writerows(cost_rows)
+    print(f"\n✅ Вартість рівнів надійності збережено у файл {filename}")
+
+def save_preencode_comparison(all_results, filename="benchmark_preencode_comparison.csv"):
+    """Порівняння прогонів зі звичайним і попереднім кодуванням документів
+
+    Різниця затримок запису оцінює частку клієнтської побудови та
+    серіалізації документа в загальній вартості вставки.
+    """
+    def cell(row):
+        return (row["database"], row["scenario"], row["document_size"], row["compression"],
+                row["durability"], row["documents"])
+    
+    encoded = {cell(row): row for row in all_results if row["preencoded"]}
+    comparison_rows = []
+    for row in all_results:
+        pre = encoded.get(cell(row))
+        if row["preencoded"] or pre is None:
+            continue
+        client_share = None
+        if row["write_p50_latency"] and pre["write_p50_latency"] is not None:
+            client_share = max(0.0, 1 - pre["write_p50_latency"] / row["write_p50_latency"])
+        comparison_rows.append({
+            "database": row["database"],
+            "scenario": row["scenario"],
+            "document_size": row["document_size"],
+            "compression": row["compression"],
+            "durability": row["durability"],
+            "documents": row["documents"],
+            "throughput": row["throughput"],
+            "preencoded_throughput": pre["throughput"],
+            "write_p50_latency": row["write_p50_latency"],
+            "preencoded_write_p50_latency": pre["write_p50_latency"],
+            "client_encoding_share": client_share
+        })
+    
+    if not comparison_rows:
+        return
+    with open(filename, mode="w", newline='', encoding='utf-8') as file:
+        writer = csv.DictWriter(file, fieldnames=comparison_rows[0].keys())
+        writer.writeheader()
+        writer.writerows(comparison_rows)
+    print(f"\n✅ Порівняння з попереднім кодуванням збережено у файл {filename}")
+
+def run_all_benchmarks(key_distribution=KEY_DISTRIBUTION, generator=None, sweep_compression=False,
+                       sweep_durability=False, live=None, compare_preencode=False):
+    """Запуск всіх бенчмарків для всіх баз даних
+
+    sweep_compression: повторити кожен тест для всіх налаштувань стиснення з COMPRESSION_SETTINGS.
+    sweep_durability: повторити кожен тест для всіх рівнів надійності з DURABILITY_LEVELS.
+    compare_preencode: повторити кожен тест із заздалегідь закодованими документами.
+    """
+    if generator is None:
+        generator = DocumentGenerator()
     all_results = []
     
     for db_name in AVAILABLE_DATABASES:
         print(f"\n🔍 Початок тестування бази даних: {db_name}")
         
+        compressions = COMPRESSION_SETTINGS[db_name] if sweep_compression else [None]
+        durabilities = list(DURABILITY_LEVELS[db_name]) if sweep_durability else [None]
+        preencode_modes = [False, True] if compare_preencode else [False]
+        
         for scenario_name in WORKLOAD_SCENARIOS.keys():
             for doc_size_name, doc_size in DOCUMENT_SIZES.items():
-                try:
-                    results = run_benchmark(db_name, scenario_name, 5000, doc_size)
-                    all_results.extend(results)
-                except Exception as e:
-                    print(f"❌ Помилка при тестуванні {db_name} з сценарієм {scenario_name}: {str(e)}")
-                    continue
+                for compression in compressions:
+                    for durability in durabilities:
+                        for preencode in preencode_modes:
+                            try:
+                                results = run_benchmark(db_name, scenario_name, 5000, doc_size,
+                                                        key_distribution, generator, compression,
+                                                        durability, live, preencode)
+                                all_results.extend(results)
+                            except Exception as e:
+                                print(f"❌ Помилка при тестуванні {db_name} з сценарієм {scenario_name}: {str(e)}")
+                                continue
         
         print(f"\n✅ Завершено тестування бази даних: {db_name}")
         print(f"⏳ Очікування {PAUSE_BETWEEN_EXPERIMENTS} секунд перед наступною базою даних...")
@@ -325,11 +1354,14 @@ def run_all_benchmarks():
         writer.writeheader()
         writer.writerows(all_results)
     print(f"\n✅ Всі результати збережено у файл {all_results_filename}")
+    
+    if sweep_durability:
+        save_durability_cost(all_results)
+    if compare_preencode:
+        save_preencode_comparison(all_results)
 
-def main():
-    parser = argparse.ArgumentParser(description='Комплексний інструмент бенчмарку NoSQL баз даних')
-    parser.add_argument('--mode', choices=['single', 'all'], default='all',
-                      help='Режим роботи: single - один тест, all - всі тести')
+def add_benchmark_arguments(parser):
+    """Параметри бенчмарку, спільні для цього модуля та main.py"""
     parser.add_argument('--db', choices=AVAILABLE_DATABASES,
                       help='База даних для тестування (тільки для режиму single)')
     parser.add_argument('--scenario', choices=WORKLOAD_SCENARIOS.keys(),
@@ -338,15 +1370,66 @@ def main():
                       help='Максимальна кількість документів для тестування')
     parser.add_argument('--doc-size', choices=DOCUMENT_SIZES.keys(), default='small',
                       help='Розмір тестових документів')
+    parser.add_argument('--key-distribution', choices=KEY_DISTRIBUTIONS, default=KEY_DISTRIBUTION,
+                      help='Розподіл ключів для операцій читання')
+    parser.add_argument('--seed', type=int, default=42,
+                      help='Seed генератора документів')
+    parser.add_argument('--fields', type=int, default=10,
+                      help='Кількість полів на кожному рівні згенерованого документа')
+    parser.add_argument('--depth', type=int, default=2,
+                      help='Глибина вкладеності згенерованого документа')
+    parser.add_argument('--compression-ratio', type=float, default=2.0,
+                      help='Цільовий коефіцієнт стиснення рядкових даних')
+    parser.add_argument('--type-mix', type=parse_type_mix, default=DEFAULT_TYPE_MIX,
+                      help='Частки типів полів, наприклад string=0.5,integer=0.2,array=0.3 '
+                           f'(типи: {", ".join(DEFAULT_TYPE_MIX)})')
+    parser.add_argument('--array-length', type=int, nargs=2, metavar=('MIN', 'MAX'), default=(1, 8),
+                      help='Межі довжини масивів у згенерованих документах')
+    parser.add_argument('--schema',
+                      help='JSON-схема, за якою генеруються документи (замість --fields/--depth)')
+    parser.add_argument('--compression',
+                      help='Налаштування стиснення бази даних (тільки для режиму single), '
+                           'див. COMPRESSION_SETTINGS')
+    parser.add_argument('--sweep-compression', action='store_true',
+                      help='Повторити всі тести для кожного налаштування стиснення (тільки для режиму all)')
+    parser.add_argument('--durability',
+                      help='Рівень надійності запису (тільки для режиму single), див. DURABILITY_LEVELS')
+    parser.add_argument('--sweep-durability', action='store_true',
+                      help='Повторити всі тести для кожного рівня надійності (тільки для режиму all)')
+    parser.add_argument('--preencode', action='store_true',
+                      help='Вставляти заздалегідь закодовані документи (тільки для режиму single)')
+    parser.add_argument('--compare-preencode', action='store_true',
+                      help='Повторити всі тести із заздалегідь закодованими документами (тільки для режиму all)')
+    parser.add_argument('--metrics-port', type=int,
+                      help='Порт локального ендпоінта /metrics у форматі OpenMetrics')
+
+def run_from_args(args, single):
+    """Запуск одного бенчмарку (single=True) або всієї матриці за розібраними параметрами"""
+    generator = DocumentGenerator(seed=args.seed, field_count=args.fields, depth=args.depth,
+                                  type_mix=args.type_mix, array_length=tuple(args.array_length),
+                                  compression_ratio=args.compression_ratio, schema=args.schema)
+    live = None
+    if args.metrics_port:
+        live = LiveMetrics()
+        start_metrics_server(live, args.metrics_port)
     
-    args = parser.parse_args()
+    if single:
+        return run_benchmark(args.db, args.scenario, args.max_docs, DOCUMENT_SIZES[args.doc_size],
+                             args.key_distribution, generator, args.compression, args.durability, live,
+                             args.preencode)
+    return run_all_benchmarks(args.key_distribution, generator, args.sweep_compression,
+                              args.sweep_durability, live, args.compare_preencode)
+
+def main():
+    parser = argparse.ArgumentParser(description='Комплексний інструмент бенчмарку NoSQL баз даних')
+    parser.add_argument('--mode', choices=['single', 'all'], default='all',
+                      help='Режим роботи: single - один тест, all - всі тести')
+    add_benchmark_arguments(parser)
     
-    if args.mode == 'all':
-        run_all_benchmarks()
-    else:
-        if not args.db or not args.scenario:
-            parser.error("Для режиму single потрібно вказати --db та --scenario")
-        run_benchmark(args.db, args.scenario, args.max_docs, DOCUMENT_SIZES[args.doc_size])
+    args = parser.parse_args()
+    if args.mode == 'single' and (not args.db or not args.scenario):
+        parser.error("Для режиму single потрібно вказати --db та --scenario")
+    run_from_args(args, args.mode == 'single')
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
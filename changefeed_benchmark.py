@@ -0,0 +1,184 @@
+import csv
+import time
+import argparse
+import itertools
+import threading
+from workers import OperationSource, run_workers
+from keyspace import KeySpace
+from docgen import DocumentGenerator
+from latency import LatencyHistogram
+from benchmark_comprehensive import (DOCUMENT_SIZES, THREADS, TIMEOUT, PAUSE_BETWEEN_EXPERIMENTS,
+                                     get_db_connection, create_test_doc)
+
+# Конфігурація
+CHANGE_FEED_DATABASES = ["mongodb", "arangodb", "couchdb"]  # Бази даних зі стрічкою змін
+CHANGE_FEED_RATES = [100, 500, 1000, 5000]  # Цільова швидкість запису, операцій/с
+CHANGE_FEED_SECONDS = 30  # Тривалість запису в одному прогоні
+CHANGE_FEED_CONSUMERS = 1  # Незалежних споживачів стрічки
+DRAIN_TIMEOUT = 30  # Скільки чекати на доставку подій після завершення запису, секунди
+
+def paced(handler, rate):
+    """Обмеження швидкості виклику обробника на всіх потоках разом
+
+    Кожен виклик отримує свій запланований момент start + n / rate,
+    тому відставання одного потоку не накопичується.
+    """
+    if not rate:
+        return handler
+    counter = itertools.count()
+    start = []
+
+    def operation():
+        n = next(counter)
+        if not start:
+            start.append(time.perf_counter())
+        delay = start[0] + n / rate - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        return handler()
+    return operation
+
+def consume(change_feed_fn, stop, ready, cell, state):
+    """Споживач стрічки змін: затримка доставки за міткою часу в документі"""
+    try:
+        for doc in change_feed_fn(stop, ready):
+            if doc.get("feed_cell") != cell:
+                continue  # Пізні події попереднього прогону
+            received = time.time()
+            state["lag"].record(max(0.0, received - doc["written_at"]))
+            state["events"] += 1
+            state["last"] = received
+    except Exception as e:
+        state["error"] = e
+        ready.set()
+
+def run_change_feed_benchmark(db_name, rates=CHANGE_FEED_RATES, doc_sizes=("small",),
+                              consumers=CHANGE_FEED_CONSUMERS, seconds=CHANGE_FEED_SECONDS, generator=None):
+    """Бенчмарк пропускної здатності споживачів стрічки змін і затримки доставки
+
+    Записувачі вставляють документи з міткою часу written_at, споживачі
+    читають стрічку змін і рахують різницю між моментом доставки та
+    міткою. Затримка включає і час самого запису.
+    """
+    if generator is None:
+        generator = DocumentGenerator()
+    print(f"\n🚀 Запуск бенчмарку стрічки змін для {db_name}")
+    db_connection = get_db_connection(db_name)
+    if db_connection["change_feed_fn"] is None:
+        raise ValueError(f"{db_name} не має доступної стрічки змін")
+    keys = KeySpace(prefix=db_name)
+
+    results = []
+    cells = [(size_name, rate) for size_name in doc_sizes for rate in rates]
+    for size_name, rate in cells:
+        doc_size = DOCUMENT_SIZES[size_name]
+        cell = f"{size_name}/{rate}"
+        num_ops = int(rate * seconds)
+        print(f"\n📊 {doc_size['description']}, запис {rate} оп/с, споживачів: {consumers}...")
+
+        stop = threading.Event()
+        states = []
+        threads = []
+        for _ in range(consumers):
+            state = {"lag": LatencyHistogram(), "events": 0, "last": None, "error": None}
+            ready = threading.Event()
+            thread = threading.Thread(target=consume, args=(db_connection["change_feed_fn"], stop, ready, cell, state),
+                                      daemon=True)
+            thread.start()
+            ready.wait(TIMEOUT)  # Підписка має бути активною до першого запису
+            states.append(state)
+            threads.append(thread)
+
+        def write():
+            record_id = keys.reserve()
+            doc = create_test_doc(doc_size["size"], record_id, generator)
+            doc["feed_cell"] = cell
+            doc["written_at"] = time.time()
+            db_connection["insert_fn"](keys.key(record_id), doc)
+            keys.commit(record_id)
+
+        write_start = time.time()
+        run = run_workers(OperationSource(num_ops, {"write": 100}), {"write": paced(write, rate)}, THREADS,
+                          timeout=TIMEOUT)
+        writes = run["completed_ops"]
+
+        # Очікування, поки споживачі отримають усі записані документи
+        drain_deadline = time.monotonic() + DRAIN_TIMEOUT
+        while time.monotonic() < drain_deadline and any(
+                state["events"] < writes and state["error"] is None for state in states):
+            time.sleep(0.1)
+        stop.set()
+        for thread in threads:
+            thread.join(5)
+
+        errors = [state["error"] for state in states if state["error"] is not None]
+        if errors:
+            print(f"❌ Помилка споживача: {str(errors[0])}")
+            continue
+
+        lag = LatencyHistogram()
+        for state in states:
+            lag.merge(state["lag"])
+        events = [state["events"] for state in states]
+        # Швидкість споживача - від початку запису до останньої доставленої події
+        consumer_rates = [state["events"] / (state["last"] - write_start) if state["last"] else 0
+                          for state in states]
+        print(f"  запис {writes / run['total_time'] if run['total_time'] else 0:.0f} оп/с, "
+              f"споживач {sum(consumer_rates) / len(consumer_rates):.0f} подій/с, "
+              f"p99 затримки {lag.percentile(99) or 0:.4f}s")
+        results.append({
+            "database": db_name,
+            "document_size": doc_size["description"],
+            "target_write_rate": rate,
+            "write_rate": writes / run["total_time"] if run["total_time"] else 0,
+            "writes": writes,
+            "consumers": consumers,
+            "events_per_consumer": sum(events) / len(events),
+            "missed_events": sum(max(0, writes - count) for count in events),
+            "events_per_second": sum(consumer_rates) / len(consumer_rates),
+            "avg_lag": lag.mean(),
+            **lag.summary("lag_"),
+            "timeout_occurred": run["timed_out"]
+        })
+
+        if (size_name, rate) != cells[-1]:
+            print(f"⏳ Очікування {PAUSE_BETWEEN_EXPERIMENTS} секунд перед наступним експериментом...")
+            time.sleep(PAUSE_BETWEEN_EXPERIMENTS)
+
+    if not results:
+        print("⚠️ Немає результатів")
+        return results
+    filename = f"benchmark_changefeed_{db_name}.csv"
+    with open(filename, mode="w", newline='', encoding='utf-8') as file:
+        writer = csv.DictWriter(file, fieldnames=results[0].keys())
+        writer.writeheader()
+        writer.writerows(results)
+    print(f"\n✅ Результати збережено у файл {filename}")
+    return results
+
+def add_change_feed_arguments(parser):
+    """Параметри бенчмарку стрічки змін, спільні для цього модуля та main.py"""
+    parser.add_argument('--db', choices=CHANGE_FEED_DATABASES, required=True,
+                      help='База даних для тестування')
+    parser.add_argument('--rates', type=int, nargs='+', default=CHANGE_FEED_RATES,
+                      help='Цільові швидкості запису, операцій/с')
+    parser.add_argument('--doc-sizes', choices=DOCUMENT_SIZES.keys(), nargs='+', default=['small'],
+                      help='Розміри тестових документів')
+    parser.add_argument('--consumers', type=int, default=CHANGE_FEED_CONSUMERS,
+                      help='Кількість незалежних споживачів стрічки')
+    parser.add_argument('--seconds', type=float, default=CHANGE_FEED_SECONDS,
+                      help='Тривалість запису в одному прогоні, секунди')
+    parser.add_argument('--seed', type=int, default=42,
+                      help='Seed генератора документів')
+
+def run_from_args(args):
+    return run_change_feed_benchmark(args.db, args.rates, args.doc_sizes, args.consumers, args.seconds,
+                                     DocumentGenerator(seed=args.seed))
+
+def main():
+    parser = argparse.ArgumentParser(description='Бенчмарк стрічки змін і затримки доставки')
+    add_change_feed_arguments(parser)
+    run_from_args(parser.parse_args())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import csv
+
+# Стовпці, що визначають комірку матриці бенчмарку
+CELL_COLUMNS = ["database", "scenario", "document_size", "documents", "compression",
+                "durability", "preencoded", "key_distribution"]
+
+
+def _load(csv_file):
+    with open(csv_file, newline='', encoding='utf-8') as file:
+        return {tuple(row.get(column, "") for column in CELL_COLUMNS): row for row in csv.DictReader(file)}
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def compare_results(baseline_csv, candidate_csv, output="benchmark_comparison.csv"):
+    """Порівняння двох файлів результатів benchmark_comprehensive по комірках матриці
+
+    Для спільних комірок зберігає відношення пропускної здатності та
+    зміну p99 кандидата відносно базового прогону.
+    """
+    baseline = _load(baseline_csv)
+    candidate = _load(candidate_csv)
+    rows = []
+    for cell, base_row in baseline.items():
+        row = candidate.get(cell)
+        if row is None:
+            continue
+        base_throughput = _number(base_row.get("throughput"))
+        throughput = _number(row.get("throughput"))
+        base_p99 = _number(base_row.get("p99_latency"))
+        p99 = _number(row.get("p99_latency"))
+        rows.append({
+            **dict(zip(CELL_COLUMNS, cell)),
+            "baseline_throughput": base_throughput,
+            "candidate_throughput": throughput,
+            "throughput_ratio": throughput / base_throughput if base_throughput and throughput is not None else None,
+            "baseline_p99_latency": base_p99,
+            "candidate_p99_latency": p99,
+            "p99_ratio": p99 / base_p99 if base_p99 and p99 is not None else None
+        })
+
+    if not rows:
+        print("⚠️ У файлах немає спільних комірок для порівняння")
+        return rows
+
+    with open(output, mode="w", newline='', encoding='utf-8') as file:
+        writer = csv.DictWriter(file, fieldnames=rows[0].keys())
+        writer.writeheader()
+        writer.writerows(rows)
+
+    for row in rows:
+        ratio = row["throughput_ratio"]
+        marker = "⚪" if ratio is None else ("🟢" if ratio >= 1 else "🔴")
+        ratio_text = "n/a" if ratio is None else f"{ratio:.2f}x"
+        print(f"{marker} {row['database']} / {row['scenario']} / {row['document_size']} / "
+              f"{row['documents']}: пропускна здатність {ratio_text}")
+    print(f"\n✅ Порівняння збережено у файл {output} ({len(rows)} комірок)")
+    return rows
@@ -0,0 +1,259 @@
+import csv
+import time
+import argparse
+import itertools
+import threading
+import multiprocessing
+import psutil
+from workers import OperationSource, run_workers
+from keyspace import KeySpace, KEY_DISTRIBUTIONS
+from docgen import DocumentGenerator
+from latency import LatencyHistogram
+from benchmark_comprehensive import (AVAILABLE_DATABASES, DOCUMENT_SIZES, THREADS, TIMEOUT, KEY_DISTRIBUTION,
+                                     PAUSE_BETWEEN_EXPERIMENTS, get_db_connection, build_operation_handlers)
+
+# Конфігурація
+CLIENT_COUNTS = [1, 10, 50, 100, 200]  # Кількість незалежних клієнтів
+POOL_SIZES = [1, 5, 10]  # Максимальний розмір пулу з'єднань кожного клієнта
+CONNECTION_PRELOAD_DOCS = 1000
+CONNECTION_OPERATIONS = 20000  # Операцій в одному прогоні на всіх клієнтів
+# Без вставок і видалень: незалежні клієнти не узгоджують між собою видачу ключів
+CONNECTION_MIX = {"read": 80, "update": 20}
+STATS_INTERVAL = 1  # Інтервал опитування статистики сервера в секундах
+# Порти, з'єднання з якими рахуються на стороні клієнта
+SERVER_PORTS = {"mongodb": 27017, "arangodb": 8529, "couchbase": 11210, "couchdb": 5984}
+
+def count_client_sockets(db_name):
+    """Кількість встановлених TCP-з'єднань з цього хоста до сервера бази даних"""
+    port = SERVER_PORTS[db_name]
+    return sum(1 for conn in psutil.net_connections(kind="tcp")
+               if conn.raddr and conn.raddr.port == port and conn.status == psutil.CONN_ESTABLISHED)
+
+def run_clients(db_name, num_clients, pool_size, threads_per_client, num_ops, preloaded,
+                key_distribution=KEY_DISTRIBUTION, doc_size=DOCUMENT_SIZES["small"], seed=42, barrier=None):
+    """Прогін num_clients незалежних клієнтів у поточному процесі
+
+    Кожен клієнт має власний пул з'єднань і threads_per_client потоків,
+    закріплених за ним. preloaded - кількість уже завантажених документів.
+    """
+    generator = DocumentGenerator(seed=seed)
+    keys = KeySpace(prefix=db_name, distribution=key_distribution)
+    for _ in range(preloaded):
+        keys.commit(keys.reserve())
+    connections = [get_db_connection(db_name, pool_size=pool_size, reset=False) for _ in range(num_clients)]
+    clients = [build_operation_handlers(connection, keys, doc_size, generator) for connection in connections]
+
+    # Потік закріплюється за клієнтом при першій операції
+    thread_state = threading.local()
+    assignment = itertools.count()
+
+    def client_operation(op_type):
+        def operation():
+            handlers = getattr(thread_state, "handlers", None)
+            if handlers is None:
+                handlers = thread_state.handlers = clients[next(assignment) % num_clients]
+            return handlers[op_type]()
+        return operation
+
+    if barrier is not None:
+        barrier.wait(TIMEOUT)  # Усі процеси починають вимірювання одночасно
+    handlers = {op_type: client_operation(op_type) for op_type in CONNECTION_MIX}
+    try:
+        run = run_workers(OperationSource(num_ops, CONNECTION_MIX), handlers, num_clients * threads_per_client,
+                          timeout=TIMEOUT)
+    finally:
+        # Інакше з'єднання попередньої комірки потрапили б у базовий рівень наступної
+        for connection in connections:
+            connection["close_fn"]()
+    latency = LatencyHistogram()
+    for histogram in run["latency"].values():
+        latency.merge(histogram)
+    return {"completed_ops": run["completed_ops"], "total_time": run["total_time"],
+            "timed_out": run["timed_out"], "latency": latency}
+
+def _client_process(results, args, kwargs):
+    try:
+        results.put(run_clients(*args, **kwargs))
+    except Exception as e:
+        results.put(e)
+
+class ServerStatsPoller:
+    """Фонове опитування кількості з'єднань і пам'яті сервера з фіксацією піків"""
+    def __init__(self, db_name, db_connection):
+        self.db_name = db_name
+        self.db_connection = db_connection
+        self.peak = {}
+        self.is_running = False
+        self.thread = None
+
+    def sample(self):
+        stats = self.db_connection["connection_stats_fn"]()
+        stats["client_sockets"] = count_client_sockets(self.db_name)
+        return stats
+
+    def start(self):
+        self.peak = {}
+        self.is_running = True
+        self.thread = threading.Thread(target=self._poll, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.is_running = False
+        if self.thread:
+            self.thread.join()
+        return self.peak
+
+    def _poll(self):
+        while self.is_running:
+            try:
+                for name, value in self.sample().items():
+                    if value is not None:
+                        self.peak[name] = max(value, self.peak.get(name, value))
+            except Exception as e:
+                print(f"⚠️ Не вдалося отримати статистику з'єднань: {str(e)}")
+            time.sleep(STATS_INTERVAL)
+
+def run_connection_benchmark(db_name, client_counts=CLIENT_COUNTS, pool_sizes=POOL_SIZES, processes=1,
+                             threads_per_client=None, num_ops=CONNECTION_OPERATIONS,
+                             key_distribution=KEY_DISTRIBUTION, doc_size=DOCUMENT_SIZES["small"], seed=42):
+    """Бенчмарк масштабування кількості клієнтів і розміру їхніх пулів з'єднань
+
+    Клієнти розподіляються між processes процесами. Якщо threads_per_client
+    не задано, кожен клієнт має стільки потоків, скільки з'єднань у пулі,
+    щоб пул було використано повністю.
+    """
+    print(f"\n🚀 Запуск бенчмарку з'єднань для {db_name}")
+    generator = DocumentGenerator(seed=seed)
+    db_connection = get_db_connection(db_name)
+    keys = KeySpace(prefix=db_name, distribution=key_distribution)
+    operations = build_operation_handlers(db_connection, keys, doc_size, generator)
+    print(f"📥 Завантаження {CONNECTION_PRELOAD_DOCS} документів...")
+    run_workers(OperationSource(CONNECTION_PRELOAD_DOCS, {"write": 100}), {"write": operations["write"]}, THREADS)
+    poller = ServerStatsPoller(db_name, db_connection)
+    # spawn: драйвери баз даних не підтримують fork після підключення
+    context = multiprocessing.get_context("spawn")
+
+    results = []
+    cells = [(clients, pool_size) for clients in client_counts for pool_size in pool_sizes]
+    for num_clients, pool_size in cells:
+        threads = threads_per_client or pool_size
+        workers = min(processes, num_clients)
+        print(f"\n📊 {num_clients} клієнтів, пул {pool_size}, {threads} потоків на клієнта, {workers} процесів...")
+        baseline = poller.sample()
+        poller.start()
+
+        # Клієнти і операції діляться між процесами якомога рівніше
+        shares = [(num_clients // workers + (i < num_clients % workers),
+                   num_ops // workers + (i < num_ops % workers)) for i in range(workers)]
+        common = {"key_distribution": key_distribution, "doc_size": doc_size, "seed": seed}
+        procs = []
+        try:
+            if workers == 1:
+                runs = [run_clients(db_name, num_clients, pool_size, threads, num_ops, CONNECTION_PRELOAD_DOCS,
+                                    **common)]
+            else:
+                queue = context.Queue()
+                barrier = context.Barrier(workers)
+                procs = [context.Process(target=_client_process, args=(
+                    queue, (db_name, clients, pool_size, threads, ops, CONNECTION_PRELOAD_DOCS),
+                    {**common, "barrier": barrier})) for clients, ops in shares]
+                for proc in procs:
+                    proc.start()
+                runs = [queue.get(timeout=TIMEOUT * 3) for _ in procs]
+                for proc in procs:
+                    proc.join()
+                errors = [run for run in runs if isinstance(run, Exception)]
+                if errors:
+                    raise errors[0]
+        except Exception as e:
+            # Процеси, що не повернули результат (наприклад, після queue.Empty), не мають пережити комірку
+            for proc in procs:
+                if proc.is_alive():
+                    proc.terminate()
+                proc.join()
+            poller.stop()
+            print(f"❌ Помилка: {str(e)}")
+            continue
+        peak = poller.stop()
+
+        completed = sum(run["completed_ops"] for run in runs)
+        total_time = max(run["total_time"] for run in runs)
+        latency = LatencyHistogram()
+        for run in runs:
+            latency.merge(run["latency"])
+
+        added_connections = None
+        memory_per_connection = None
+        if peak.get("server_connections") is not None and baseline["server_connections"] is not None:
+            added_connections = peak["server_connections"] - baseline["server_connections"]
+        elif peak.get("client_sockets") is not None:
+            added_connections = peak["client_sockets"] - baseline["client_sockets"]
+        if added_connections and peak.get("server_memory_bytes") is not None:
+            memory_per_connection = (peak["server_memory_bytes"] - baseline["server_memory_bytes"]) / added_connections
+
+        throughput = completed / total_time if total_time else 0
+        print(f"  {throughput:.0f} оп/с, з'єднань на сервері: {peak.get('server_connections')}, "
+              f"сокетів клієнтів: {peak.get('client_sockets')}")
+        results.append({
+            "database": db_name,
+            "clients": num_clients,
+            "pool_size": pool_size,
+            "threads_per_client": threads,
+            "processes": workers,
+            "completed_ops": completed,
+            "total_time": total_time,
+            "throughput": throughput,
+            "avg_latency": latency.mean(),
+            **latency.summary(),
+            "baseline_server_connections": baseline["server_connections"],
+            "peak_server_connections": peak.get("server_connections"),
+            "peak_client_sockets": peak.get("client_sockets"),
+            "baseline_server_memory": baseline["server_memory_bytes"],
+            "peak_server_memory": peak.get("server_memory_bytes"),
+            "memory_per_connection": memory_per_connection,
+            "timeout_occurred": any(run["timed_out"] for run in runs)
+        })
+
+        if (num_clients, pool_size) != cells[-1]:
+            print(f"⏳ Очікування {PAUSE_BETWEEN_EXPERIMENTS} секунд перед наступним експериментом...")
+            time.sleep(PAUSE_BETWEEN_EXPERIMENTS)
+
+    if not results:
+        print("⚠️ Немає результатів")
+        return results
+    filename = f"benchmark_connections_{db_name}.csv"
+    with open(filename, mode="w", newline='', encoding='utf-8') as file:
+        writer = csv.DictWriter(file, fieldnames=results[0].keys())
+        writer.writeheader()
+        writer.writerows(results)
+    print(f"\n✅ Результати збережено у файл {filename}")
+    return results
+
+def add_connection_arguments(parser):
+    """Параметри бенчмарку з'єднань, спільні для цього модуля та main.py"""
+    parser.add_argument('--db', choices=AVAILABLE_DATABASES, required=True,
+                      help='База даних для тестування')
+    parser.add_argument('--clients', type=int, nargs='+', default=CLIENT_COUNTS,
+                      help='Кількості незалежних клієнтів')
+    parser.add_argument('--pool-sizes', type=int, nargs='+', default=POOL_SIZES,
+                      help="Розміри пулу з'єднань кожного клієнта")
+    parser.add_argument('--processes', type=int, default=1,
+                      help='Кількість процесів, між якими розподіляються клієнти')
+    parser.add_argument('--threads-per-client', type=int,
+                      help='Потоків на клієнта (за замовчуванням дорівнює розміру пулу)')
+    parser.add_argument('--ops', type=int, default=CONNECTION_OPERATIONS,
+                      help='Кількість операцій в одному прогоні')
+    parser.add_argument('--key-distribution', choices=KEY_DISTRIBUTIONS, default=KEY_DISTRIBUTION,
+                      help='Розподіл ключів для операцій')
+
+def run_from_args(args):
+    return run_connection_benchmark(args.db, args.clients, args.pool_sizes, args.processes,
+                                    args.threads_per_client, args.ops, args.key_distribution)
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк кількості клієнтів і розміру пулів з'єднань")
+    add_connection_arguments(parser)
+    run_from_args(parser.parse_args())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+import json
+import random
+import uuid
+import zlib
+import numpy as np
+
+# Алфавіт рядкових значень: лише ASCII, щоб розмір у JSON і BSON збігався з довжиною рядка
+ALPHABET = np.frombuffer(
+    b"abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789-_", dtype=np.uint8)
+
+# Частки типів полів за замовчуванням
+DEFAULT_TYPE_MIX = {
+    "string": 0.45,
+    "integer": 0.2,
+    "number": 0.1,
+    "boolean": 0.1,
+    "array": 0.1,
+    "object": 0.05
+}
+
+POOL_SIZE = 4 * 1024 * 1024   # Розмір пулу випадкових символів
+POOL_BLOCK = 64               # Розмір блоку пулу в символах
+POOL_VOCABULARY = 32          # Кількість повторюваних блоків, що задають стисливість
+CALIBRATION_SAMPLE = 256 * 1024
+
+_MASK64 = 0xFFFFFFFFFFFFFFFF
+
+
+class _Stream:
+    """Потік псевдовипадкових чисел SplitMix64 для одного документа.
+
+    Ініціалізація коштує одне множення, тому кожен документ отримує
+    власний детермінований потік без спільного стану між потоками.
+    """
+    __slots__ = ("state",)
+
+    def __init__(self, seed, record_id):
+        self.state = (seed * 0x9E3779B97F4A7C15 + record_id) & _MASK64
+
+    def next(self):
+        self.state = (self.state + 0x9E3779B97F4A7C15) & _MASK64
+        z = self.state
+        z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+        z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & _MASK64
+        return z ^ (z >> 31)
+
+    def below(self, n):
+        return self.next() % n if n > 0 else 0
+
+    def uniform(self):
+        return (self.next() >> 11) / float(1 << 53)
+
+
+class DocumentGenerator:
+    """Відтворюваний генератор вкладених тестових документів.
+
+    Структура документа (кількість полів, глибина, типи, довжини масивів)
+    фіксується один раз із seed або з JSON-схеми. Рядкові значення
+    вирізаються з заздалегідь згенерованого пулу, стисливість якого
+    відкалібрована під цільовий коефіцієнт стиснення.
+    """
+    def __init__(self, seed=42, field_count=10, depth=2, type_mix=None,
+                 array_length=(1, 8), compression_ratio=2.0, schema=None, pool_size=POOL_SIZE):
+        self.seed = seed
+        self.field_count = field_count
+        self.depth = depth
+        self.type_mix = type_mix or DEFAULT_TYPE_MIX
+        self.array_length = array_length
+        if not 0 <= array_length[0] <= array_length[1]:
+            raise ValueError(f"Некоректні межі довжини масивів: {array_length}")
+        self.compression_ratio = compression_ratio
+        self.schema_name = None
+        self._string_lengths = {}
+
+        self.pool, self.pool_ratio = _build_pool(seed, pool_size, compression_ratio)
+
+        if schema is not None:
+            self.schema_name = schema if isinstance(schema, str) else "inline"
+            self.template = compile_schema(load_schema(schema))
+        else:
+            self.template = self._random_template(random.Random(seed), depth)
+
+        # Кількість рядків без обмеження довжини, між якими ділиться розмір документа
+        self._free_strings = _count_free_strings(self.template)
+
+    def describe(self):
+        """Опис налаштувань генератора для звітів"""
+        if self.schema_name:
+            return f"schema={self.schema_name},seed={self.seed},cr={self.compression_ratio}"
+        types = "/".join(f"{kind}:{weight:g}" for kind, weight in self.type_mix.items())
+        lo, hi = self.array_length
+        return (f"seed={self.seed},fields={self.field_count},depth={self.depth},"
+                f"cr={self.compression_ratio},types={types},arrays={lo}-{hi}")
+
+    def generate(self, record_id, size_bytes):
+        """Документ для ідентифікатора запису приблизно заданого розміру в JSON"""
+        stream = _Stream(self.seed, record_id)
+        return self._fill(self.template, stream, self._string_length(size_bytes))
+
+    def document_uuid(self, record_id):
+        """Детермінований UUID документа"""
+        stream = _Stream(self.seed ^ 0x5BD1E995, record_id)
+        return str(uuid.UUID(int=(stream.next() << 64) | stream.next(), version=4))
+
+    def _string_length(self, size_bytes):
+        length = self._string_lengths.get(size_bytes)
+        if length is None:
+            if self._free_strings:
+                overhead = len(json.dumps(self._fill(self.template, _Stream(self.seed, 0), 0)))
+                length = max(0, int((size_bytes - overhead) / self._free_strings))
+            else:
+                length = 0
+            self._string_lengths[size_bytes] = length
+        return length
+
+    def _text(self, stream, length):
+        if length <= 0:
+            return ""
+        pool = self.pool
+        pool_len = len(pool)
+        if length <= pool_len // 2:
+            start = stream.below(pool_len - length)
+            return pool[start:start + length]
+        parts = []
+        while length > 0:
+            chunk = min(length, pool_len // 2)
+            start = stream.below(pool_len - chunk)
+            parts.append(pool[start:start + chunk])
+            length -= chunk
+        return "".join(parts)
+
+    def _fill(self, node, stream, free_length):
+        kind = node["type"]
+        if kind == "object":
+            return {name: self._fill(child, stream, free_length) for name, child in node["fields"]}
+        if kind == "array":
+            count = node["min"] + stream.below(node["max"] - node["min"] + 1)
+            return [self._fill(node["items"], stream, free_length) for _ in range(count)]
+        if kind == "string":
+            if node["free"]:
+                return self._text(stream, free_length)
+            return self._text(stream, node["min"] + stream.below(node["max"] - node["min"] + 1))
+        if kind == "integer":
+            return node["min"] + stream.below(node["max"] - node["min"] + 1)
+        if kind == "number":
+            return round(node["min"] + stream.uniform() * (node["max"] - node["min"]), 6)
+        if kind == "boolean":
+            return bool(stream.next() & 1)
+        if kind == "enum":
+            return node["values"][stream.below(len(node["values"]))]
+        return None
+
+    def _random_template(self, rng, depth, prefix="attr"):
+        types = list(self.type_mix.keys())
+        weights = list(self.type_mix.values())
+        fields = []
+        for i in range(self.field_count):
+            kind = rng.choices(types, weights)[0]
+            if kind == "object" and depth <= 1:
+                kind = "string"
+            fields.append((f"{prefix}_{i}", self._random_node(rng, kind, depth, f"{prefix}_{i}")))
+        return {"type": "object", "fields": fields}
+
+    def _random_node(self, rng, kind, depth, name):
+        if kind == "object":
+            return self._random_template(rng, depth - 1, name)
+        if kind == "array":
+            # Рядки в масивах короткі, щоб довжина масиву не змінювала розмір документа
+            item_kind = rng.choice(["string", "integer", "number"])
+            if item_kind == "string":
+                items = {"type": "string", "free": False, "min": 4, "max": 16}
+            else:
+                items = self._random_node(rng, item_kind, depth, name)
+            lo, hi = self.array_length
+            return {"type": "array", "items": items, "min": lo, "max": hi}
+        if kind == "string":
+            return {"type": "string", "free": True}
+        if kind == "integer":
+            return {"type": "integer", "min": 0, "max": 1_000_000}
+        if kind == "number":
+            return {"type": "number", "min": 0.0, "max": 10_000.0}
+        return {"type": "boolean"}
+
+
+def parse_type_mix(text):
+    """Частки типів полів з рядка виду string=0.5,integer=0.2,...
+
+    Частки - відносні ваги й не мусять давати в сумі 1.
+    """
+    type_mix = {}
+    for item in text.split(","):
+        kind, _, weight = item.partition("=")
+        kind = kind.strip()
+        if kind not in DEFAULT_TYPE_MIX:
+            raise ValueError(f"Невідомий тип поля: {kind}")
+        type_mix[kind] = float(weight)
+        if type_mix[kind] < 0:
+            raise ValueError(f"Від'ємна частка типу {kind}")
+    if not sum(type_mix.values()):
+        raise ValueError("Сума часток типів полів має бути більшою за нуль")
+    return type_mix
+
+
+def load_schema(schema):
+    """Завантаження JSON-схеми з файлу або з уже розібраного словника"""
+    if isinstance(schema, dict):
+        return schema
+    with open(schema, encoding="utf-8") as file:
+        return json.load(file)
+
+
+def compile_schema(schema):
+    """Перетворення підмножини JSON Schema на шаблон генератора.
+
+    Підтримуються object/properties, array/items/minItems/maxItems,
+    string/minLength/maxLength, integer, number (minimum/maximum),
+    boolean та enum. Рядки без maxLength ділять між собою цільовий
+    розмір документа.
+    """
+    if "enum" in schema:
+        return {"type": "enum", "values": list(schema["enum"])}
+    kind = schema.get("type", "object")
+    if isinstance(kind, list):
+        kind = next((k for k in kind if k != "null"), "string")
+    if kind == "object":
+        properties = schema.get("properties", {})
+        return {"type": "object",
+                "fields": [(name, compile_schema(sub)) for name, sub in properties.items()]}
+    if kind == "array":
+        lo = schema.get("minItems", 1)
+        return {"type": "array", "items": compile_schema(schema.get("items", {"type": "string"})),
+                "min": lo, "max": schema.get("maxItems", max(lo, 8))}
+    if kind == "string":
+        if "maxLength" in schema:
+            return {"type": "string", "free": False,
+                    "min": schema.get("minLength", 0), "max": schema["maxLength"]}
+        return {"type": "string", "free": True}
+    if kind == "integer":
+        return {"type": "integer", "min": int(schema.get("minimum", 0)),
+                "max": int(schema.get("maximum", 1_000_000))}
+    if kind == "number":
+        return {"type": "number", "min": float(schema.get("minimum", 0.0)),
+                "max": float(schema.get("maximum", 10_000.0))}
+    if kind == "boolean":
+        return {"type": "boolean"}
+    return {"type": "null"}
+
+
+def _count_free_strings(node):
+    """Очікувана кількість рядків без обмеження довжини в документі"""
+    kind = node["type"]
+    if kind == "object":
+        return sum(_count_free_strings(child) for _, child in node["fields"])
+    if kind == "array":
+        return _count_free_strings(node["items"]) * (node["min"] + node["max"]) / 2
+    if kind == "string":
+        return 1 if node["free"] else 0
+    return 0
+
+
+def _build_pool(seed, pool_size, compression_ratio):
+    """Пул символів з відкаліброваною стисливістю.
+
+    Пул складається з блоків двох видів: випадкових і взятих з малого
+    словника повторюваних блоків. Частка випадкових блоків підбирається
+    бісекцією так, щоб zlib стискав пул приблизно у compression_ratio разів.
+    Найменший досяжний коефіцієнт (лише випадкові блоки) близько 1.33.
+    """
+    rng = np.random.default_rng(seed)
+    n_blocks = max(1, pool_size // POOL_BLOCK)
+    random_blocks = rng.integers(0, len(ALPHABET), size=(n_blocks, POOL_BLOCK), dtype=np.uint8)
+    vocabulary = rng.integers(0, len(ALPHABET), size=(POOL_VOCABULARY, POOL_BLOCK), dtype=np.uint8)
+    vocabulary_index = rng.integers(0, POOL_VOCABULARY, size=n_blocks)
+    draw = rng.random(n_blocks)
+
+    def build(fraction, blocks):
+        chosen = np.where((draw[:blocks] < fraction)[:, None],
+                          random_blocks[:blocks], vocabulary[vocabulary_index[:blocks]])
+        return ALPHABET[chosen].tobytes()
+
+    def ratio(data):
+        return len(data) / len(zlib.compress(data, 6))
+
+    sample_blocks = min(n_blocks, max(1, CALIBRATION_SAMPLE // POOL_BLOCK))
+    lo, hi = 0.0, 1.0
+    for _ in range(12):
+        mid = (lo + hi) / 2
+        if ratio(build(mid, sample_blocks)) > compression_ratio:
+            lo = mid
+        else:
+            hi = mid
+    pool = build(hi, n_blocks)
+    return pool.decode("ascii"), ratio(pool)
@@ -0,0 +1,171 @@
+import itertools
+import math
+import random
+import threading
+import numpy as np
+
+# Стани записів у реєстрі ключів
+EMPTY = 0     # ідентифікатор видано, але запис ще не підтверджено
+LIVE = 1      # запис вставлено
+DELETED = 2   # запис видалено
+
+# Розмір одного блоку реєстру; блоки не переміщуються, тому запис у них безпечний без блокування
+CHUNK_SIZE = 1 << 20
+
+KEY_DISTRIBUTIONS = ["uniform", "zipfian", "latest"]
+
+ZIPFIAN_CONSTANT = 0.99
+
+
+class KeySpace:
+    """Реєстр ключів, спільний для всіх баз даних.
+
+    Записи ідентифікуються цілими числами, а ключ детерміновано
+    обчислюється з ідентифікатора, тому реєстр зберігає лише один байт
+    стану на запис у заздалегідь виділених масивах numpy.
+    """
+    def __init__(self, prefix="doc", distribution="uniform", seed=None):
+        if distribution not in KEY_DISTRIBUTIONS:
+            raise ValueError(f"Непідтримуваний розподіл ключів: {distribution}")
+        self.prefix = prefix
+        self.distribution = distribution
+        self.seed = seed
+        self._counter = itertools.count()
+        self._allocated = 0
+        self._chunks = []
+        self._grow_lock = threading.Lock()
+        self._local = threading.local()
+        self._seeds = itertools.count()
+        self._zipf = _ZipfianSampler(ZIPFIAN_CONSTANT)
+
+    def key(self, record_id):
+        """Детермінований ключ для ідентифікатора запису"""
+        return f"{self.prefix}_{record_id:012d}"
+
+    def key_length(self):
+        """Довжина ключа (однакова для ідентифікаторів до 10^12)"""
+        return len(self.key(0))
+
+    def reserve(self):
+        """Видача нового ідентифікатора запису (до підтвердження вставки)"""
+        record_id = next(self._counter)
+        chunk = record_id // CHUNK_SIZE
+        # Під блокуванням: інакше потік з меншим ідентифікатором міг би
+        # зменшити _allocated і назавжди сховати найновіший запис від вибірки
+        with self._grow_lock:
+            while chunk >= len(self._chunks):
+                self._chunks.append(np.zeros(CHUNK_SIZE, dtype=np.uint8))
+            if record_id >= self._allocated:
+                self._allocated = record_id + 1
+        return record_id
+
+    def commit(self, record_id):
+        """Позначення запису як вставленого"""
+        self._chunks[record_id // CHUNK_SIZE][record_id % CHUNK_SIZE] = LIVE
+
+    def delete(self, record_id):
+        """Позначення запису як видаленого"""
+        self._chunks[record_id // CHUNK_SIZE][record_id % CHUNK_SIZE] = DELETED
+
+    def state(self, record_id):
+        return self._chunks[record_id // CHUNK_SIZE][record_id % CHUNK_SIZE]
+
+    def sample(self, attempts=8):
+        """Вибір ідентифікатора вставленого запису згідно з розподілом.
+
+        Повертає None, якщо за кілька спроб не знайдено живого запису.
+        """
+        n = self._allocated
+        if n == 0:
+            return None
+        rng = self._rng()
+        for _ in range(attempts):
+            if self.distribution == "uniform":
+                record_id = int(rng.random() * n)
+            elif self.distribution == "zipfian":
+                # Розсіювання рангу, щоб популярні записи не були сусідніми
+                rank = self._zipf.sample(n, rng.random())
+                record_id = _fnv_hash(rank) % n
+            else:  # latest: найпопулярніші найновіші записи
+                record_id = n - 1 - self._zipf.sample(n, rng.random())
+            if self.state(record_id) == LIVE:
+                return record_id
+        return None
+
+    def sample_key(self):
+        record_id = self.sample()
+        return None if record_id is None else self.key(record_id)
+
+    def count(self):
+        """Кількість виданих ідентифікаторів"""
+        return self._allocated
+
+    def live_count(self):
+        """Кількість вставлених і не видалених записів"""
+        n = self._allocated
+        total = 0
+        for i, chunk in enumerate(self._chunks):
+            size = min(CHUNK_SIZE, n - i * CHUNK_SIZE)
+            if size <= 0:
+                break
+            total += int(np.count_nonzero(chunk[:size] == LIVE))
+        return total
+
+    def _rng(self):
+        rng = getattr(self._local, "rng", None)
+        if rng is None:
+            seed = None if self.seed is None else (self.seed, next(self._seeds))
+            rng = random.Random(str(seed) if seed is not None else None)
+            self._local.rng = rng
+        return rng
+
+
+class _ZipfianSampler:
+    """Генератор рангів за розподілом Ципфа (алгоритм Gray et al., як у YCSB).
+
+    Дзета-функція оновлюється інкрементально при зростанні кількості
+    записів, тому вибірка коштує O(1) в амортизованому сенсі.
+    """
+    def __init__(self, theta):
+        self.theta = theta
+        self.alpha = 1.0 / (1.0 - theta)
+        self.zeta2 = 1.0 + 0.5 ** theta
+        self._lock = threading.Lock()
+        self._params = (0, 0.0, 0.0)  # (n, zetan, eta)
+
+    def _update(self, n):
+        with self._lock:
+            old_n, zetan, _ = self._params
+            if n <= old_n:
+                return self._params
+            ranks = np.arange(old_n + 1, n + 1, dtype=np.float64)
+            zetan += float(np.sum(ranks ** -self.theta))
+            eta = (1 - (2.0 / n) ** (1 - self.theta)) / (1 - self.zeta2 / zetan) if n > 2 else 0.0
+            self._params = (n, zetan, eta)
+            return self._params
+
+    def sample(self, n, u):
+        """Ранг у діапазоні [0, n)"""
+        params = self._params
+        if params[0] < n:
+            params = self._update(n)
+        # Інший потік міг уже розширити параметри далі за n
+        items, zetan, eta = params
+        uz = u * zetan
+        if uz < 1.0:
+            rank = 0
+        elif uz < self.zeta2:
+            rank = 1
+        else:
+            rank = int(items * math.pow(eta * u - eta + 1, self.alpha))
+        return min(n - 1, rank)
+
+
+def _fnv_hash(value):
+    """64-бітний FNV-1a для розсіювання рангів"""
+    h = 0xCBF29CE484222325
+    for _ in range(8):
+        h ^= value & 0xFF
+        h = (h * 0x100000001B3) & 0xFFFFFFFFFFFFFFFF
+        value >>= 8
+    return h
@@ -0,0 +1,113 @@
+import math
+
+# Відносна точність бакета гістограми (2%)
+PRECISION = 0.02
+_SCALE = 1.0 / math.log1p(PRECISION)
+# Значення зберігаються в мікросекундах; верхня межа - 1000 секунд
+_MAX_MICROS = 1e9
+_BUCKETS = int(math.log(_MAX_MICROS) * _SCALE) + 2
+
+
+class LatencyHistogram:
+    """Логарифмічна гістограма затримок з фіксованим обсягом пам'яті.
+
+    Кожен бакет покриває відносний діапазон PRECISION, тому перцентилі
+    мають похибку не більше 2% незалежно від кількості записаних значень.
+    Гістограма не потокобезпечна: кожен потік веде власну, а результати
+    об'єднуються через merge.
+    """
+    __slots__ = ("counts", "count", "total", "min", "max")
+
+    def __init__(self):
+        self.counts = [0] * _BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def record(self, seconds):
+        micros = seconds * 1e6
+        if micros < 1.0:
+            index = 0
+        else:
+            index = min(_BUCKETS - 1, int(math.log(micros) * _SCALE) + 1)
+        self.counts[index] += 1
+        self.count += 1
+        self.total += seconds
+        if self.min is None or seconds < self.min:
+            self.min = seconds
+        if self.max is None or seconds > self.max:
+            self.max = seconds
+
+    def merge(self, other):
+        counts = self.counts
+        for index, value in enumerate(other.counts):
+            if value:
+                counts[index] += value
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+        if other.max is not None and (self.max is None or other.max > self.max):
+            self.max = other.max
+        return self
+
+    def copy(self):
+        other = LatencyHistogram()
+        other.counts = list(self.counts)
+        other.count = self.count
+        other.total = self.total
+        other.min = self.min
+        other.max = self.max
+        return other
+
+    def since(self, earlier):
+        """Гістограма значень, записаних після знімка earlier (copy)
+
+        Точні мінімум і максимум інтервалу невідомі, тому максимумом
+        вважається верхня межа найвищого непорожнього бакета.
+        """
+        interval = LatencyHistogram()
+        interval.counts = [now - before for now, before in zip(self.counts, earlier.counts)]
+        interval.count = self.count - earlier.count
+        interval.total = self.total - earlier.total
+        top = max((index for index, value in enumerate(interval.counts) if value > 0), default=None)
+        if top is not None:
+            interval.max = bucket_upper_bound(top)
+        return interval
+
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def percentile(self, pct):
+        """Перцентиль у секундах (верхня межа бакета, обмежена максимумом)"""
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(self.count * pct / 100))
+        seen = 0
+        for index, value in enumerate(self.counts):
+            seen += value
+            if seen >= rank:
+                return min(self.max, bucket_upper_bound(index))
+        return self.max
+
+    def buckets(self):
+        """Непорожні бакети як пари (верхня межа в секундах, кількість)"""
+        return [(bucket_upper_bound(index), value) for index, value in enumerate(self.counts) if value]
+
+    def summary(self, prefix=""):
+        """Стислий звіт для рядка результатів"""
+        return {
+            f"{prefix}p50_latency": self.percentile(50),
+            f"{prefix}p95_latency": self.percentile(95),
+            f"{prefix}p99_latency": self.percentile(99),
+            f"{prefix}p999_latency": self.percentile(99.9),
+            f"{prefix}max_latency": self.max
+        }
+
+
+def bucket_upper_bound(index):
+    """Верхня межа бакета в секундах"""
+    if index == 0:
+        return 1e-6
+    return math.exp(index / _SCALE) / 1e6
@@ -1,52 +1,152 @@
-from benchmark import run_benchmark
-from visualization import visualize_results
-from advanced_visualization import visualize_pro, visualize_workload
-from benchmark_advanced import run_benchmark_pro, run_workload_benchmarks
-from benchmark_new import run_benchmark as run_new_benchmark
 import argparse
+import time
+import psutil
+import benchmark_comprehensive
+import scan_benchmark
+import transaction_benchmark
+import connection_benchmark
+import soak_benchmark
+import changefeed_benchmark
+import op_trace
+import multiget_benchmark
+from startup_timings import IMPORT_TIMINGS, import_timer
 
-def run_all_benchmarks():
-    """Запуск всіх типів бенчмарків"""
+
+def run_advanced_suite():
+    """Запуск бенчмарків benchmark_advanced: звичайного та зі сценаріями навантаження"""
+    with import_timer("benchmark_advanced"):
+        from benchmark_advanced import run_benchmark_pro, run_workload_benchmarks
     print("🚀 Запуск бенчмарків...")
-    
-    # Запускаємо обидва типи бенчмарків
     run_benchmark_pro()  # Звичайний бенчмарк
     run_workload_benchmarks()  # Бенчмарк з різними сценаріями навантаження
-    
+    print("\n✅ Всі бенчмарки завершено!")
+
+
+def run_basic_suite():
+    """Запуск найпростішого бенчмарку з benchmark.py"""
+    with import_timer("benchmark"):
+        from benchmark import run_benchmark
+    run_benchmark()
+
+
+def plot(kind, csv_file=None):
+    """Побудова графіків; pandas і matplotlib імпортуються лише тут"""
     print("\n📊 Створення візуалізацій...")
-    # Створюємо всі типи графіків
-    visualize_pro()  # Графіки для звичайного бенчмарку
-    visualize_workload()  # Графіки для різних сценаріїв навантаження
-    
-    print("\n✅ Всі бенчмарки та візуалізації завершено!")
-
-def run_single_benchmark(db_name, scenario_name, num_docs):
-    """Запуск одиночного бенчмарку з новим інструментом"""
-    print(f"🚀 Запуск бенчмарку для {db_name} зі сценарієм {scenario_name}...")
-    results = run_new_benchmark(db_name, scenario_name, num_docs)
-    print("\n✅ Бенчмарк завершено!")
-    return results
+    # Власний файл результатів можна вказати лише для одного типу графіків
+    kwargs = {"csv_file": csv_file} if csv_file and kind != "all" else {}
+    if kind == "basic":
+        with import_timer("plotting"):
+            from visualization import visualize_results
+        visualize_results(**kwargs)
+        return
+    with import_timer("plotting"):
+        from advanced_visualization import visualize_pro, visualize_workload
+    if kind in ("pro", "all"):
+        visualize_pro(**kwargs)  # Графіки для звичайного бенчмарку
+    if kind in ("workload", "all"):
+        visualize_workload(**kwargs)  # Графіки для різних сценаріїв навантаження
+    print("\n✅ Візуалізації завершено!")
 
-def main():
+
+def print_timings(cli_ready, total):
+    """Звіт про час холодного старту та відкладених імпортів"""
+    print("\n⏱️ Час запуску:")
+    print(f"  від старту процесу до готовності CLI: {cli_ready:.3f}s")
+    for label, seconds in IMPORT_TIMINGS.items():
+        print(f"  імпорт {label}: {seconds:.3f}s")
+    print(f"  загалом: {total:.3f}s")
+
+
+def build_parser():
     parser = argparse.ArgumentParser(description='NoSQL Database Benchmark Suite')
-    parser.add_argument('--mode', choices=['all', 'single'], default='all',
-                      help='Режим роботи: all - всі бенчмарки, single - одиночний бенчмарк')
-    parser.add_argument('--db', choices=['mongodb', 'arangodb', 'couchbase'],
-                      help='База даних для тестування (тільки для режиму single)')
-    parser.add_argument('--scenario', 
-                      choices=['read_heavy', 'balanced', 'write_heavy', 'read_only', 'write_only'],
-                      help='Сценарій навантаження (тільки для режиму single)')
-    parser.add_argument('--docs', type=int, default=1000,
-                      help='Кількість документів для тестування (тільки для режиму single)')
-    
+    parser.add_argument('--timings', action='store_true',
+                      help='Вивести час холодного старту та імпорту драйверів')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='Одиночний бенчмарк для однієї бази даних')
+    benchmark_comprehensive.add_benchmark_arguments(run_parser)
+
+    matrix_parser = commands.add_parser('matrix', help='Повна матриця бенчмарків')
+    matrix_parser.add_argument('--suite', choices=['comprehensive', 'advanced', 'basic'],
+                             default='comprehensive', help='Набір бенчмарків')
+    benchmark_comprehensive.add_benchmark_arguments(matrix_parser)
+
+    plot_parser = commands.add_parser('plot', help='Графіки за результатами бенчмарків')
+    plot_parser.add_argument('--kind', choices=['basic', 'pro', 'workload', 'all'], default='all',
+                           help='Які графіки будувати')
+    plot_parser.add_argument('--csv', help='Файл результатів (за замовчуванням - стандартний для типу графіків)')
+
+    scan_parser = commands.add_parser('scan', help='Потокове сканування всієї колекції')
+    scan_benchmark.add_scan_arguments(scan_parser)
+
+    txn_parser = commands.add_parser('transactions', help='Багатодокументні транзакції (MongoDB, ArangoDB)')
+    transaction_benchmark.add_transaction_arguments(txn_parser)
+
+    connections_parser = commands.add_parser('connections', help="Масштабування кількості клієнтів і пулів з'єднань")
+    connection_benchmark.add_connection_arguments(connections_parser)
+
+    soak_parser = commands.add_parser('soak', help='Тривалий прогін з контрольними точками за розміром набору')
+    soak_benchmark.add_soak_arguments(soak_parser)
+
+    feed_parser = commands.add_parser('changefeed', help='Споживання стрічки змін і затримка доставки')
+    changefeed_benchmark.add_change_feed_arguments(feed_parser)
+
+    trace_parser = commands.add_parser('trace', help='Запис, імпорт і відтворення трасувань операцій')
+    op_trace.add_trace_arguments(trace_parser)
+
+    multiget_parser = commands.add_parser('multiget', help='Пакетне читання кількох ключів проти окремих запитів')
+    multiget_benchmark.add_multiget_arguments(multiget_parser)
+
+    compare_parser = commands.add_parser('compare', help='Порівняння двох файлів результатів')
+    compare_parser.add_argument('baseline', help='Базовий файл результатів benchmark_comprehensive')
+    compare_parser.add_argument('candidate', help='Файл результатів для порівняння')
+    compare_parser.add_argument('--output', default='benchmark_comparison.csv',
+                              help='Файл для збереження порівняння')
+    return parser
+
+
+def main():
+    parser = build_parser()
     args = parser.parse_args()
-    
-    if args.mode == 'all':
-        run_all_benchmarks()
-    else:
+    process_started = psutil.Process().create_time()
+    cli_ready = time.time() - process_started
+
+    if args.command == 'run':
         if not args.db or not args.scenario:
-            parser.error("Для режиму single потрібно вказати --db та --scenario")
-        run_single_benchmark(args.db, args.scenario, args.docs)
+            parser.error("Для команди run потрібно вказати --db та --scenario")
+        benchmark_comprehensive.run_from_args(args, single=True)
+    elif args.command == 'matrix':
+        if args.suite == 'advanced':
+            run_advanced_suite()
+        elif args.suite == 'basic':
+            run_basic_suite()
+        else:
+            benchmark_comprehensive.run_from_args(args, single=False)
+    elif args.command == 'plot':
+        plot(args.kind, args.csv)
+    elif args.command == 'scan':
+        scan_benchmark.run_from_args(args)
+    elif args.command == 'transactions':
+        transaction_benchmark.run_from_args(args)
+    elif args.command == 'connections':
+        connection_benchmark.run_from_args(args)
+    elif args.command == 'soak':
+        if args.duration is None and args.target_docs is None:
+            parser.error("Для команди soak потрібно вказати --duration або --target-docs")
+        soak_benchmark.run_from_args(args)
+    elif args.command == 'changefeed':
+        changefeed_benchmark.run_from_args(args)
+    elif args.command == 'trace':
+        op_trace.run_from_args(args)
+    elif args.command == 'multiget':
+        multiget_benchmark.run_from_args(args)
+    elif args.command == 'compare':
+        from compare_results import compare_results
+        compare_results(args.baseline, args.candidate, args.output)
+
+    if args.timings:
+        print_timings(cli_ready, time.time() - process_started)
+
 
 if __name__ == "__main__":
     main()
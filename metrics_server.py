@@ -0,0 +1,133 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from latency import LatencyHistogram
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+# Межі бакетів гістограми затримок для дашбордів (секунди)
+EXPORT_BUCKETS = [0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+
+
+class LiveMetrics:
+    """Поточний стан бенчмарку для ендпоінта OpenMetrics.
+
+    Гарячий шлях нічого не повідомляє явно: run_workers реєструє свої
+    лічильники та гістограми потоків, а ендпоінт читає їх лише під час
+    запиту. Читання без блокування дає узгоджений з точністю до кількох
+    операцій знімок, чого достатньо для моніторингу.
+    """
+    def __init__(self):
+        self.cell = ""
+        self._run = None
+        self._system = None
+        self._lock = threading.Lock()
+        self._last_scrape = None  # (час, кількість операцій)
+
+    def begin_cell(self, cell_id, system_metrics=None):
+        """Початок нової комірки матриці бенчмарку"""
+        self.cell = cell_id
+        self._system = system_metrics
+        self._run = None
+
+    def attach_run(self, run_state):
+        """Реєстрація стану прогону run_workers"""
+        self._run = run_state
+
+    def render(self):
+        """Стан у текстовому форматі OpenMetrics"""
+        lines = []
+        cell = self.cell.replace("\\", "\\\\").replace('"', '\\"')
+        lines.append("# TYPE nosql_bench_cell info")
+        lines.append(f'nosql_bench_cell_info{{cell="{cell}"}} 1')
+
+        run = self._run
+        completed = 0
+        if run is not None:
+            completed = sum(run["completed"])
+            lines.append("# TYPE nosql_bench_in_flight gauge")
+            lines.append(f"nosql_bench_in_flight {sum(run['in_flight'])}")
+            lines.append("# TYPE nosql_bench_errors counter")
+            lines.append(f"nosql_bench_errors_total {len(run['errors'])}")
+
+            latency = {}
+            for local in run["histograms"]:
+                for op_type, histogram in local.items():
+                    latency.setdefault(op_type, LatencyHistogram()).merge(histogram)
+            lines.append("# TYPE nosql_bench_ops counter")
+            for op_type, histogram in latency.items():
+                lines.append(f'nosql_bench_ops_total{{op="{op_type}"}} {histogram.count}')
+            lines.append("# TYPE nosql_bench_latency_seconds histogram")
+            for op_type, histogram in latency.items():
+                lines.extend(_histogram_lines(op_type, histogram))
+
+        lines.append("# TYPE nosql_bench_ops_per_second gauge")
+        lines.append(f"nosql_bench_ops_per_second {self._rate(completed):.3f}")
+
+        system = self._system
+        if system is not None and system.metrics:
+            sample = system.metrics[-1]
+            lines.append("# TYPE nosql_bench_system_cpu_percent gauge")
+            lines.append(f"nosql_bench_system_cpu_percent {sample['cpu_percent']}")
+            lines.append("# TYPE nosql_bench_system_memory_percent gauge")
+            lines.append(f"nosql_bench_system_memory_percent {sample['memory_percent']}")
+            lines.append("# TYPE nosql_bench_system_disk_bytes gauge")
+            lines.append(f'nosql_bench_system_disk_bytes{{direction="read"}} {sample["disk_io"].read_bytes}')
+            lines.append(f'nosql_bench_system_disk_bytes{{direction="write"}} {sample["disk_io"].write_bytes}')
+            lines.append("# TYPE nosql_bench_system_net_bytes gauge")
+            lines.append(f'nosql_bench_system_net_bytes{{direction="sent"}} {sample["net_io"].bytes_sent}')
+            lines.append(f'nosql_bench_system_net_bytes{{direction="recv"}} {sample["net_io"].bytes_recv}')
+
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def _rate(self, completed):
+        """Операції за секунду з часу попереднього запиту"""
+        now = time.monotonic()
+        with self._lock:
+            last = self._last_scrape
+            self._last_scrape = (now, completed)
+        if last is None or now <= last[0] or completed < last[1]:
+            return 0.0
+        return (completed - last[1]) / (now - last[0])
+
+
+def _histogram_lines(op_type, histogram):
+    lines = []
+    buckets = histogram.buckets()
+    index = 0
+    cumulative = 0
+    for bound in EXPORT_BUCKETS:
+        while index < len(buckets) and buckets[index][0] <= bound:
+            cumulative += buckets[index][1]
+            index += 1
+        lines.append(f'nosql_bench_latency_seconds_bucket{{op="{op_type}",le="{bound}"}} {cumulative}')
+    lines.append(f'nosql_bench_latency_seconds_bucket{{op="{op_type}",le="+Inf"}} {histogram.count}')
+    lines.append(f'nosql_bench_latency_seconds_sum{{op="{op_type}"}} {histogram.total}')
+    lines.append(f'nosql_bench_latency_seconds_count{{op="{op_type}"}} {histogram.count}')
+    return lines
+
+
+def start_metrics_server(live, port, host="127.0.0.1"):
+    """Запуск HTTP-сервера /metrics у фоновому потоці"""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = live.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # Не засмічуємо вивід бенчмарку журналом запитів
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    print(f"📡 Метрики доступні на http://{host}:{port}/metrics")
+    return server
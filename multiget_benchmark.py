@@ -0,0 +1,143 @@
+import csv
+import time
+import argparse
+import itertools
+from workers import OperationSource, run_workers
+from keyspace import KeySpace, KEY_DISTRIBUTIONS
+from docgen import DocumentGenerator
+from benchmark_comprehensive import (AVAILABLE_DATABASES, DOCUMENT_SIZES, THREADS, TIMEOUT, KEY_DISTRIBUTION,
+                                     PAUSE_BETWEEN_EXPERIMENTS, get_db_connection, build_operation_handlers)
+
+# Конфігурація
+MULTIGET_DOCS = 10000  # Документи, серед яких вибираються ключі
+MULTIGET_KEYS = 100000  # Ключів, що читаються в одному прогоні
+MULTIGET_BATCH_SIZES = [1, 10, 50, 100, 500, 1000]  # 1 - окремі запити через read_fn
+# Ключів у заздалегідь вибраних пакетах для кожного розміру; пакети використовуються по колу
+MULTIGET_RING_KEYS = 100000
+
+def sample_batch(keys, batch_size):
+    """Пакет різних ключів: повтори в multi_read_fn читаються один раз і завищили б ключі/с"""
+    batch = {}
+    while len(batch) < batch_size:
+        key = keys.sample_key()
+        if key is not None:
+            batch[key] = None
+    return list(batch)
+
+def batch_ring(keys, batch_size, ring_keys=MULTIGET_RING_KEYS):
+    """Обробник-джерело пакетів, вибраних до початку вимірювань
+
+    Вибір ключів за розподілом не входить ні в затримку, ні в час прогону.
+    """
+    batches = [sample_batch(keys, batch_size) for _ in range(max(1, ring_keys // batch_size))]
+    counter = itertools.count()
+    return lambda: batches[next(counter) % len(batches)]
+
+def run_multiget_benchmark(db_name, batch_sizes=MULTIGET_BATCH_SIZES, num_keys=MULTIGET_KEYS,
+                           num_docs=MULTIGET_DOCS, key_distribution=KEY_DISTRIBUTION,
+                           doc_size=DOCUMENT_SIZES["small"], generator=None):
+    """Порівняння пакетного читання кількох ключів з окремими запитами
+
+    Для кожного розміру пакета читається однакова кількість ключів;
+    розмір 1 виконується звичайним read_fn і є базою для порівняння.
+    Ключі вибираються заздалегідь (batch_ring), щоб вибір не потрапляв у затримку;
+    ключі в одному пакеті різні.
+    """
+    if generator is None:
+        generator = DocumentGenerator()
+    print(f"\n🚀 Запуск бенчмарку пакетного читання для {db_name}")
+    print(f"🔑 Розподіл ключів: {key_distribution}")
+
+    db_connection = get_db_connection(db_name)
+    keys = KeySpace(prefix=db_name, distribution=key_distribution)
+    operations = build_operation_handlers(db_connection, keys, doc_size, generator)
+    print(f"📥 Завантаження {num_docs} документів...")
+    run_workers(OperationSource(num_docs, {"write": 100}), {"write": operations["write"]}, THREADS)
+
+    batch_sizes = sorted(batch_sizes)  # Окремі запити першими, як база для порівняння
+    results = []
+    single_keys_per_second = None
+    for batch_size in batch_sizes:
+        print(f"\n📊 Розмір пакета {batch_size}...")
+        if batch_size > keys.live_count():
+            print(f"⚠️ Пакет {batch_size} більший за кількість документів, пропускаємо")
+            continue
+        next_batch = batch_ring(keys, batch_size)
+        if batch_size == 1:
+            def read(next_batch=next_batch):
+                db_connection["read_fn"](next_batch()[0])
+        else:
+            def read(next_batch=next_batch):
+                db_connection["multi_read_fn"](next_batch())
+        num_ops = max(1, num_keys // batch_size)
+        run = run_workers(OperationSource(num_ops, {"read": 100}), {"read": read}, THREADS, timeout=TIMEOUT)
+        latency = run["latency"]["read"]
+        completed = run["completed_ops"]
+        total_time = run["total_time"]
+        keys_per_second = completed * batch_size / total_time if total_time else 0
+        if batch_size == 1:
+            single_keys_per_second = keys_per_second
+        mean = latency.mean()
+        print(f"  {keys_per_second:.0f} ключів/с, {completed / total_time if total_time else 0:.0f} запитів/с")
+        results.append({
+            "database": db_name,
+            "key_distribution": key_distribution,
+            "document_size": doc_size["description"],
+            "batch_size": batch_size,
+            "requests": completed,
+            "keys_read": completed * batch_size,
+            "total_time": total_time,
+            "requests_per_second": completed / total_time if total_time else 0,
+            "keys_per_second": keys_per_second,
+            "speedup_vs_single": keys_per_second / single_keys_per_second if single_keys_per_second else None,
+            "avg_batch_latency": mean,
+            **latency.summary("batch_"),
+            # Частка затримки пакета, що припадає на один ключ
+            "per_key_latency": mean / batch_size if mean is not None else None,
+            "per_key_p99_latency": latency.percentile(99) / batch_size if latency.count else None,
+            "timeout_occurred": run["timed_out"]
+        })
+
+        if batch_size != batch_sizes[-1]:
+            print(f"⏳ Очікування {PAUSE_BETWEEN_EXPERIMENTS} секунд перед наступним експериментом...")
+            time.sleep(PAUSE_BETWEEN_EXPERIMENTS)
+
+    if not results:
+        print("⚠️ Немає результатів")
+        return results
+    filename = f"benchmark_multiget_{db_name}_{key_distribution}.csv"
+    with open(filename, mode="w", newline='', encoding='utf-8') as file:
+        writer = csv.DictWriter(file, fieldnames=results[0].keys())
+        writer.writeheader()
+        writer.writerows(results)
+    print(f"\n✅ Результати збережено у файл {filename}")
+    return results
+
+def add_multiget_arguments(parser):
+    """Параметри бенчмарку пакетного читання, спільні для цього модуля та main.py"""
+    parser.add_argument('--db', choices=AVAILABLE_DATABASES, required=True,
+                      help='База даних для тестування')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=MULTIGET_BATCH_SIZES,
+                      help='Розміри пакетів (1 - окремі запити)')
+    parser.add_argument('--keys', type=int, default=MULTIGET_KEYS,
+                      help='Кількість ключів, що читаються для кожного розміру пакета')
+    parser.add_argument('--docs', type=int, default=MULTIGET_DOCS,
+                      help='Кількість документів у колекції')
+    parser.add_argument('--key-distribution', choices=KEY_DISTRIBUTIONS, default=KEY_DISTRIBUTION,
+                      help='Розподіл ключів для читання')
+    parser.add_argument('--doc-size', choices=DOCUMENT_SIZES.keys(), default='small',
+                      help='Розмір тестових документів')
+    parser.add_argument('--seed', type=int, default=42,
+                      help='Seed генератора документів')
+
+def run_from_args(args):
+    return run_multiget_benchmark(args.db, args.batch_sizes, args.keys, args.docs, args.key_distribution,
+                                  DOCUMENT_SIZES[args.doc_size], DocumentGenerator(seed=args.seed))
+
+def main():
+    parser = argparse.ArgumentParser(description='Бенчмарк пакетного читання кількох ключів')
+    add_multiget_arguments(parser)
+    run_from_args(parser.parse_args())
+
+if __name__ == "__main__":
+    main()
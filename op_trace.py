@@ -0,0 +1,342 @@
+import csv
+import json
+import time
+import struct
+import argparse
+import itertools
+import threading
+import numpy as np
+from workers import OperationSource, run_workers
+from keyspace import KeySpace, KEY_DISTRIBUTIONS
+from docgen import DocumentGenerator
+from latency import LatencyHistogram
+from benchmark_comprehensive import (AVAILABLE_DATABASES, WORKLOAD_SCENARIOS, DOCUMENT_SIZES, THREADS,
+                                     KEY_DISTRIBUTION, PRELOAD_DOCS, TEST_DOC, get_db_connection, scenario_mix)
+
+# Формат файлу трасування: заголовок і записи фіксованого розміру без вирівнювання
+TRACE_MAGIC = b"NSQLTRC1"
+TRACE_VERSION = 2
+# magic, версія, кількість ключів, що завантажуються перед відтворенням, розмір їхніх документів у байтах
+TRACE_HEADER = struct.Struct("<8sIQI")
+TRACE_DTYPE = np.dtype([
+    ("ts_us", "<u8"),  # Запланований момент операції від початку трасування, мікросекунди
+    ("key_id", "<u8"),
+    ("size", "<u4"),  # Розмір документа в байтах (0 для операцій без документа)
+    ("op", "u1")  # Індекс у TRACE_OPS
+])
+# Порядок кодів операцій фіксований форматом файлу
+TRACE_OPS = ("read", "write", "replace", "update", "upsert", "delete", "rmw")
+# Операції, що передають документ повністю
+DOCUMENT_OPS = ("write", "replace", "upsert")
+UPDATE_SIZE = 16  # Умовний розмір часткового оновлення в байтах
+CHUNK_RECORDS = 65536  # Записів в одному блоці при записі файлу
+
+class TraceWriter:
+    """Потоковий запис трасування блоками фіксованого розміру"""
+    def __init__(self, filename, preload=0, preload_size=0):
+        self.file = open(filename, "wb")
+        self.file.write(TRACE_HEADER.pack(TRACE_MAGIC, TRACE_VERSION, preload, preload_size))
+        self.chunk = np.zeros(CHUNK_RECORDS, dtype=TRACE_DTYPE)
+        self.filled = 0
+        self.count = 0
+
+    def append(self, ts_us, key_id, size, op_type):
+        record = self.chunk[self.filled]
+        record["ts_us"] = ts_us
+        record["key_id"] = key_id
+        record["size"] = size
+        record["op"] = TRACE_OPS.index(op_type)
+        self.filled += 1
+        self.count += 1
+        if self.filled == CHUNK_RECORDS:
+            self.flush()
+
+    def flush(self):
+        self.chunk[:self.filled].tofile(self.file)
+        self.filled = 0
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+def open_trace(filename):
+    """Записи трасування через memory map, кількість і розмір документів для попереднього завантаження"""
+    with open(filename, "rb") as file:
+        magic, version, preload, preload_size = TRACE_HEADER.unpack(file.read(TRACE_HEADER.size))
+    if magic != TRACE_MAGIC or version != TRACE_VERSION:
+        raise ValueError(f"{filename} не є файлом трасування версії {TRACE_VERSION}")
+    records = np.memmap(filename, dtype=TRACE_DTYPE, mode="r", offset=TRACE_HEADER.size)
+    return records, preload, preload_size
+
+def record_workload(filename, scenario_name, num_ops, doc_size=DOCUMENT_SIZES["small"],
+                    key_distribution=KEY_DISTRIBUTION, seed=42, rate=None):
+    """Детерміноване трасування сценарію навантаження
+
+    Типи операцій обираються так само, як у run_workers (OperationSource),
+    ключі - з KeySpace із заданим seed, тому однакові параметри дають
+    ідентичний файл. rate задає заплановану швидкість операцій/с; без неї
+    всі операції заплановані на момент 0.
+    """
+    mix = scenario_mix(WORKLOAD_SCENARIOS[scenario_name])
+    source = OperationSource(num_ops, mix)
+    keys = KeySpace(distribution=key_distribution, seed=seed)
+    preload = PRELOAD_DOCS if any(op_type != "write" for op_type in mix) else 0
+    for _ in range(preload):
+        keys.commit(keys.reserve())
+
+    size = doc_size["size"] * 1024
+    writer = TraceWriter(filename, preload, size)
+    while True:
+        op = source.next()
+        if op is None:
+            break
+        index, op_type = op
+        if op_type == "write":
+            key_id = keys.reserve()
+            keys.commit(key_id)
+        else:
+            key_id = keys.sample()
+            if key_id is None:  # Немає живих записів: операція перетворюється на вставку
+                op_type = "write"
+                key_id = keys.reserve()
+                keys.commit(key_id)
+            elif op_type == "delete":
+                keys.delete(key_id)
+        ts_us = int(index * 1e6 / rate) if rate else 0
+        writer.append(ts_us, key_id, size if op_type in DOCUMENT_OPS else
+                      UPDATE_SIZE if op_type in ("update", "rmw") else 0, op_type)
+    writer.close()
+    print(f"✅ Трасування {writer.count} операцій збережено у файл {filename}")
+    return writer.count
+
+def _read_log(log_file):
+    """Рядки журналу: JSON lines або CSV з полями ts (секунди), op, key і size"""
+    with open(log_file, newline='', encoding='utf-8') as file:
+        if log_file.endswith(".csv"):
+            yield from csv.DictReader(file)
+        else:
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+
+def import_log(log_file, filename):
+    """Перетворення журналу операцій з продакшену на файл трасування
+
+    Ключі журналу отримують щільні ідентифікатори. Ключі, що вперше
+    з'являються не у вставці, мають існувати до відтворення, тому вони
+    нумеруються першими і завантажуються перед прогоном; розмір їхніх
+    документів - середній розмір документів журналу. Вставка вже існуючого
+    ключа записується як upsert, щоб відтворення не падало на дублікаті.
+    """
+    first_ops = {}
+    start = None
+    document_bytes = 0
+    document_ops = 0
+    for entry in _read_log(log_file):
+        if entry["op"] not in TRACE_OPS:
+            raise ValueError(f"Невідомий тип операції в журналі: {entry['op']}")
+        first_ops.setdefault(entry["key"], entry["op"])
+        ts = float(entry["ts"])
+        start = ts if start is None else min(start, ts)
+        if entry["op"] in DOCUMENT_OPS:
+            document_bytes += int(entry.get("size") or 0)
+            document_ops += 1
+    existing = [key for key, op_type in first_ops.items() if op_type != "write"]
+    ids = {key: key_id for key_id, key in enumerate(existing)}
+    for key in first_ops:
+        ids.setdefault(key, len(ids))
+    preload_size = (document_bytes // document_ops if document_ops
+                    else DOCUMENT_SIZES["small"]["size"] * 1024)
+
+    writer = TraceWriter(filename, len(existing), preload_size)
+    inserted = set()
+    for entry in _read_log(log_file):
+        key_id = ids[entry["key"]]
+        op_type = entry["op"]
+        if op_type == "write":
+            if key_id < len(existing) or key_id in inserted:
+                op_type = "upsert"
+            inserted.add(key_id)
+        writer.append(int((float(entry["ts"]) - start) * 1e6), key_id, int(entry.get("size") or 0), op_type)
+    writer.close()
+    print(f"✅ Імпортовано {writer.count} операцій ({len(ids)} ключів) у файл {filename}")
+    return writer.count
+
+class TraceSource:
+    """Джерело операцій run_workers, що читає записи з файлу трасування.
+
+    Запис поточної операції зберігається для потоку, що її взяв, тому
+    обробники без аргументів отримують його через current(). При
+    відтворенні із записаним темпом очікування відбувається тут, до
+    початку вимірювання затримки операції.
+    """
+    def __init__(self, records, speed=None):
+        self.records = records
+        self.total_ops = len(records)
+        self.speed = speed
+        self._counter = itertools.count()
+        self._local = threading.local()
+        self._origin = int(records[0]["ts_us"]) if len(records) else 0
+        self._start = None
+        self._lateness = []
+        self._lock = threading.Lock()
+
+    def next(self):
+        index = next(self._counter)
+        if index >= self.total_ops:
+            return None
+        record = self.records[index]
+        self._local.record = record
+        if self.speed:
+            if self._start is None:
+                self._start = time.perf_counter()
+            due = self._start + (int(record["ts_us"]) - self._origin) / 1e6 / self.speed
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            self._lateness_histogram().record(max(0.0, -delay))
+        return index, TRACE_OPS[record["op"]]
+
+    def current(self):
+        return self._local.record
+
+    def _lateness_histogram(self):
+        histogram = getattr(self._local, "lateness", None)
+        if histogram is None:
+            histogram = self._local.lateness = LatencyHistogram()
+            with self._lock:
+                self._lateness.append(histogram)
+        return histogram
+
+    def lateness(self):
+        """Відставання від запланованого моменту операцій"""
+        total = LatencyHistogram()
+        for histogram in self._lateness:
+            total.merge(histogram)
+        return total
+
+def _trace_doc(record_id, size, generator):
+    doc = TEST_DOC.copy()
+    doc["uuid"] = generator.document_uuid(record_id)
+    doc["data"] = generator.generate(record_id, size)
+    return doc
+
+def replay_trace(filename, db_name, speed=None, threads=THREADS, generator=None):
+    """Відтворення трасування на вибраній базі даних
+
+    speed=None - якнайшвидше; інакше із записаним темпом, прискореним у
+    speed разів.
+    """
+    if generator is None:
+        generator = DocumentGenerator()
+    records, preload, preload_size = open_trace(filename)
+    print(f"\n🚀 Відтворення {filename} ({len(records)} операцій) на {db_name}")
+    print(f"⏱️ Темп: {'якнайшвидше' if not speed else f'записаний x{speed}'}")
+
+    db_connection = get_db_connection(db_name)
+    keys = KeySpace(prefix=db_name)
+    if preload:
+        print(f"📥 Попереднє завантаження {preload} документів...")
+        preload_ids = itertools.count()
+
+        def preload_write():
+            record_id = next(preload_ids)
+            db_connection["insert_fn"](keys.key(record_id), _trace_doc(record_id, preload_size, generator))
+        run_workers(OperationSource(preload, {"write": 100}), {"write": preload_write}, THREADS)
+
+    source = TraceSource(records, speed)
+    update_values = itertools.count()
+
+    def handler(op_type):
+        def operation():
+            record = source.current()
+            record_id = int(record["key_id"])
+            key = keys.key(record_id)
+            if op_type in ("write", "replace", "upsert"):
+                doc = _trace_doc(record_id, int(record["size"]), generator)
+                return db_connection[f"{'insert' if op_type == 'write' else op_type}_fn"](key, doc)
+            if op_type == "update":
+                return db_connection["update_fn"](key, next(update_values))
+            return db_connection[f"{op_type}_fn"](key)
+        return operation
+
+    # Обробники для всіх типів: функція драйвера шукається лише під час виклику,
+    # тому трасування не потрібно переглядати цілком до відтворення
+    run = run_workers(source, {op_type: handler(op_type) for op_type in TRACE_OPS}, threads)
+
+    latency = LatencyHistogram()
+    for histogram in run["latency"].values():
+        latency.merge(histogram)
+    result = {
+        "database": db_name,
+        "trace": filename,
+        "operations": len(records),
+        "speed": speed or "max",
+        "completed_ops": run["completed_ops"],
+        "total_time": run["total_time"],
+        "throughput": run["completed_ops"] / run["total_time"] if run["total_time"] else 0,
+        **latency.summary(),
+        **source.lateness().summary("schedule_")
+    }
+    for op_type in TRACE_OPS:
+        histogram = run["latency"].get(op_type, LatencyHistogram())
+        result[f"{op_type}_ops"] = histogram.count
+        result[f"{op_type}_p99_latency"] = histogram.percentile(99)
+
+    output = f"benchmark_replay_{db_name}_{filename.rsplit('/', 1)[-1].split('.')[0]}.csv"
+    with open(output, mode="w", newline='', encoding='utf-8') as file:
+        writer = csv.DictWriter(file, fieldnames=result.keys())
+        writer.writeheader()
+        writer.writerow(result)
+    print(f"  {result['throughput']:.0f} оп/с, p99 {result['p99_latency'] or 0:.4f}s")
+    print(f"\n✅ Результати збережено у файл {output}")
+    return result
+
+def add_trace_arguments(parser):
+    """Підкоманди трасування, спільні для цього модуля та main.py"""
+    commands = parser.add_subparsers(dest='trace_command', required=True)
+    record_parser = commands.add_parser('record', help='Записати детерміноване трасування сценарію')
+    record_parser.add_argument('output', help='Файл трасування')
+    record_parser.add_argument('--scenario', choices=WORKLOAD_SCENARIOS.keys(), default='balanced',
+                             help='Сценарій навантаження')
+    record_parser.add_argument('--ops', type=int, default=100000,
+                             help='Кількість операцій')
+    record_parser.add_argument('--doc-size', choices=DOCUMENT_SIZES.keys(), default='small',
+                             help='Розмір документів')
+    record_parser.add_argument('--key-distribution', choices=KEY_DISTRIBUTIONS, default=KEY_DISTRIBUTION,
+                             help='Розподіл ключів')
+    record_parser.add_argument('--seed', type=int, default=42,
+                             help='Seed вибору ключів')
+    record_parser.add_argument('--rate', type=float,
+                             help='Запланована швидкість операцій/с для відтворення в записаному темпі')
+
+    import_parser = commands.add_parser('import', help='Імпортувати журнал операцій (JSON lines або CSV)')
+    import_parser.add_argument('log', help='Журнал з полями ts, op, key, size')
+    import_parser.add_argument('output', help='Файл трасування')
+
+    replay_parser = commands.add_parser('replay', help='Відтворити трасування на базі даних')
+    replay_parser.add_argument('trace', help='Файл трасування')
+    replay_parser.add_argument('--db', choices=AVAILABLE_DATABASES, required=True,
+                             help='База даних для відтворення')
+    replay_parser.add_argument('--speed', type=float,
+                             help='Відтворювати в записаному темпі з цим множником (за замовчуванням - якнайшвидше)')
+    replay_parser.add_argument('--threads', type=int, default=THREADS,
+                             help='Кількість потоків')
+    replay_parser.add_argument('--seed', type=int, default=42,
+                             help='Seed генератора документів')
+
+def run_from_args(args):
+    if args.trace_command == 'record':
+        return record_workload(args.output, args.scenario, args.ops, DOCUMENT_SIZES[args.doc_size],
+                               args.key_distribution, args.seed, args.rate)
+    if args.trace_command == 'import':
+        return import_log(args.log, args.output)
+    return replay_trace(args.trace, args.db, args.speed, args.threads, DocumentGenerator(seed=args.seed))
+
+def main():
+    parser = argparse.ArgumentParser(description='Запис і відтворення трасувань операцій')
+    add_trace_arguments(parser)
+    run_from_args(parser.parse_args())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+import itertools
+
+# Символ-заповнювач місця ключа; не входить до алфавіту генератора документів
+PLACEHOLDER_CHAR = "~"
+
+
+class PreencodedPayloads:
+    """Набір документів, закодованих один раз перед прогоном.
+
+    Кожен документ кодується (BSON або JSON) разом із заповнювачем ключа
+    фіксованої довжини. У гарячому циклі залишається лише вставити ключ
+    у копію готового буфера без повторного кодування.
+    """
+    def __init__(self, docs, encode, key_field, key_length):
+        self.key_length = key_length
+        self._templates = []
+        placeholder = PLACEHOLDER_CHAR * key_length
+        for doc in docs:
+            if key_field:
+                doc = {key_field: placeholder, **doc}
+            data = encode(doc)
+            offset = data.find(placeholder.encode("ascii")) if key_field else -1
+            if key_field and offset < 0:
+                raise ValueError("Заповнювач ключа не знайдено в закодованому документі")
+            self._templates.append((memoryview(data), offset, data))
+        self._counter = itertools.count()
+
+    def __len__(self):
+        return len(self._templates)
+
+    def payload(self, key, index=None):
+        """Закодований документ зі вставленим ключем
+
+        Ключ має довжину key_length, тому довжина і структура буфера
+        (зокрема довжини рядків у BSON) не змінюються.
+        """
+        if index is None:
+            index = next(self._counter)
+        view, offset, data = self._templates[index % len(self._templates)]
+        if offset < 0:
+            return data
+        encoded_key = key.encode("ascii")
+        if len(encoded_key) != self.key_length:
+            raise ValueError(f"Довжина ключа {key} не дорівнює {self.key_length}")
+        # Одна копія буфера: join приймає memoryview без проміжних байтів
+        return b"".join((view[:offset], encoded_key, view[offset + self.key_length:]))
@@ -0,0 +1,136 @@
+import time
+import json
+import csv
+import argparse
+import psutil
+from workers import OperationSource, run_workers
+from keyspace import KeySpace
+from docgen import DocumentGenerator
+from benchmark_comprehensive import (AVAILABLE_DATABASES, DOCUMENT_SIZES, THREADS,
+                                     get_db_connection, build_operation_handlers)
+
+# Конфігурація
+SCAN_DOCS = 10000  # Кількість документів, що завантажуються перед скануванням
+SCAN_BATCH_SIZES = [10, 100, 1000, 10000]  # Розміри пакетів курсора
+SCAN_PROJECTIONS = {
+    "full": None,  # Повні документи
+    "projection": ["name", "value", "uuid"]  # Лише кілька полів верхнього рівня
+}
+BYTES_SAMPLE_EVERY = 100  # Розмір у JSON рахується для кожного N-го документа
+RSS_SAMPLE_EVERY = 1000  # Пам'ять процесу перевіряється кожні N документів
+
+def scan_collection(db_connection, batch_size, fields=None):
+    """Один повний прохід курсором по колекції без збереження документів
+
+    Обсяг даних оцінюється за розміром JSON кожного BYTES_SAMPLE_EVERY-го
+    документа, щоб серіалізація не домінувала у вимірюваннях.
+    """
+    process = psutil.Process()
+    rss_before = process.memory_info().rss
+    peak_rss = rss_before
+    docs = 0
+    sampled_docs = 0
+    sampled_bytes = 0
+    first_doc_time = None
+
+    start_time = time.perf_counter()
+    for doc in db_connection["scan_fn"](batch_size, fields):
+        if first_doc_time is None:
+            first_doc_time = time.perf_counter() - start_time
+        if docs % BYTES_SAMPLE_EVERY == 0:
+            sampled_bytes += len(json.dumps(doc, default=str))
+            sampled_docs += 1
+        if docs % RSS_SAMPLE_EVERY == 0:
+            peak_rss = max(peak_rss, process.memory_info().rss)
+        docs += 1
+    total_time = time.perf_counter() - start_time
+    peak_rss = max(peak_rss, process.memory_info().rss)
+
+    estimated_bytes = sampled_bytes / sampled_docs * docs if sampled_docs else 0
+    return {
+        "scanned_docs": docs,
+        "total_time": total_time,
+        "docs_per_second": docs / total_time if total_time else 0,
+        "bytes_per_second": estimated_bytes / total_time if total_time else 0,
+        "avg_doc_bytes": sampled_bytes / sampled_docs if sampled_docs else 0,
+        "time_to_first_doc": first_doc_time,
+        "peak_rss": peak_rss,
+        "rss_growth": peak_rss - rss_before
+    }
+
+def run_scan_benchmark(db_name, num_docs=SCAN_DOCS, doc_size=DOCUMENT_SIZES["small"], generator=None,
+                       batch_sizes=SCAN_BATCH_SIZES, projections=SCAN_PROJECTIONS):
+    """Бенчмарк сканування всієї колекції з різними розмірами пакетів і проєкціями"""
+    if generator is None:
+        generator = DocumentGenerator()
+    print(f"\n🚀 Запуск бенчмарку сканування для {db_name}")
+    print(f"📦 Розмір документу: {doc_size['description']}")
+
+    db_connection = get_db_connection(db_name)
+    keys = KeySpace(prefix=db_name)
+    operations = build_operation_handlers(db_connection, keys, doc_size, generator)
+
+    # Завантаження даних не вимірюється
+    print(f"📥 Завантаження {num_docs} документів...")
+    run_workers(OperationSource(num_docs, {"write": 100}), {"write": operations["write"]}, THREADS)
+    if db_connection["prepare_scan_fn"] is not None:
+        db_connection["prepare_scan_fn"]()
+
+    results = []
+    for projection_name, fields in projections.items():
+        for batch_size in batch_sizes:
+            print(f"\n📊 Сканування: {projection_name}, розмір пакета {batch_size}...")
+            try:
+                scan = scan_collection(db_connection, batch_size, fields)
+            except Exception as e:
+                print(f"❌ Помилка сканування: {str(e)}")
+                continue
+            print(f"  {scan['docs_per_second']:.0f} док/с, "
+                  f"{scan['bytes_per_second'] / 1024 / 1024:.2f} МБ/с, "
+                  f"перший документ через {scan['time_to_first_doc'] or 0:.4f}s")
+            results.append({
+                "database": db_name,
+                "document_size": doc_size["description"],
+                "documents": num_docs,
+                "projection": projection_name,
+                "fields": ",".join(fields) if fields else "",
+                "batch_size": batch_size,
+                **scan
+            })
+
+    if not results:
+        print("⚠️ Немає результатів сканування")
+        return results
+
+    filename = f"benchmark_scan_{db_name}_{doc_size['size']}kb.csv"
+    with open(filename, mode="w", newline='', encoding='utf-8') as file:
+        writer = csv.DictWriter(file, fieldnames=results[0].keys())
+        writer.writeheader()
+        writer.writerows(results)
+    print(f"\n✅ Результати збережено у файл {filename}")
+    return results
+
+def add_scan_arguments(parser):
+    """Параметри бенчмарку сканування, спільні для цього модуля та main.py"""
+    parser.add_argument('--db', choices=AVAILABLE_DATABASES, required=True,
+                      help='База даних для тестування')
+    parser.add_argument('--docs', type=int, default=SCAN_DOCS,
+                      help='Кількість документів у колекції перед скануванням')
+    parser.add_argument('--doc-size', choices=DOCUMENT_SIZES.keys(), default='small',
+                      help='Розмір тестових документів')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=SCAN_BATCH_SIZES,
+                      help='Розміри пакетів курсора')
+    parser.add_argument('--seed', type=int, default=42,
+                      help='Seed генератора документів')
+
+def run_from_args(args):
+    generator = DocumentGenerator(seed=args.seed)
+    return run_scan_benchmark(args.db, args.docs, DOCUMENT_SIZES[args.doc_size], generator, args.batch_sizes)
+
+def main():
+    parser = argparse.ArgumentParser(description='Бенчмарк потокового сканування колекції')
+    add_scan_arguments(parser)
+    run_from_args(parser.parse_args())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+import csv
+import threading
+import time
+from latency import LatencyHistogram
+
+# Інтервал опитування внутрішньої статистики сервера в секундах
+SCRAPE_INTERVAL = 1
+
+# Метрики ArangoDB, що зберігаються (префікси назв з /_admin/metrics/v2)
+ARANGO_METRIC_PREFIXES = (
+    "rocksdb_block_cache", "rocksdb_cache", "rocksdb_actual_delayed_write_rate", "rocksdb_write_stall",
+    "rocksdb_num_running_compactions", "rocksdb_num_running_flushes", "rocksdb_estimate_pending_compaction",
+    "arangodb_scheduler_queue", "arangodb_scheduler_ongoing", "arangodb_transactions",
+    "arangodb_http_request_statistics", "arangodb_client_connection_statistics_client_connections"
+)
+
+# Поля останнього зразка статистики бакета Couchbase
+COUCHBASE_STATS = [
+    "ops", "cmd_get", "cmd_set", "get_hits", "get_misses", "ep_bg_fetched", "vb_active_resident_items_ratio",
+    "ep_queue_size", "ep_flusher_todo", "disk_write_queue", "ep_num_value_ejects", "mem_used", "curr_connections"
+]
+
+
+def parse_openmetrics(text, prefixes=()):
+    """Лічильники та показники з тексту Prometheus/OpenMetrics
+
+    Береться лише перше значення кожної метрики без урахування міток;
+    гістограми та summary пропускаються.
+    """
+    types = {}
+    counters = {}
+    gauges = {}
+    for line in text.splitlines():
+        if line.startswith("# TYPE "):
+            parts = line.split()
+            if len(parts) >= 4:
+                types[parts[2]] = parts[3]
+            continue
+        if not line or line.startswith("#"):
+            continue
+        name = line.split("{", 1)[0].split(" ", 1)[0]
+        if prefixes and not name.startswith(prefixes):
+            continue
+        metric_type = types.get(name) or types.get(name.removesuffix("_total"))
+        if metric_type not in ("counter", "gauge"):
+            continue
+        try:
+            value = float(line.rsplit(" ", 1)[1])
+        except (IndexError, ValueError):
+            continue
+        target = counters if metric_type == "counter" else gauges
+        target.setdefault(name, value)
+    return {"counters": counters, "gauges": gauges}
+
+
+def flatten_couchdb_stats(stats, prefix=""):
+    """Лічильники та показники з вкладеної відповіді _node/_local/_stats"""
+    counters = {}
+    gauges = {}
+    for name, value in stats.items():
+        path = f"{prefix}{name}"
+        if not isinstance(value, dict):
+            continue
+        if value.get("type") == "counter":
+            counters[path] = value.get("value", 0)
+        elif value.get("type") == "gauge":
+            gauges[path] = value.get("value", 0)
+        elif "type" not in value:
+            nested = flatten_couchdb_stats(value, f"{path}.")
+            counters.update(nested["counters"])
+            gauges.update(nested["gauges"])
+    return {"counters": counters, "gauges": gauges}
+
+
+class ServerMetricsScraper:
+    """Періодичне опитування внутрішньої статистики бази даних під час прогону.
+
+    Для кожного інтервалу зберігає приріст лічильників сервера, поточні
+    значення показників і клієнтську часову лінію того ж інтервалу
+    (операції та перцентилі затримок), щоб сплески промахів кешу чи
+    витіснень стояли поруч зі сплесками затримок, які вони спричинили.
+    Стан клієнта надає run_workers через attach_run, як і для LiveMetrics.
+    """
+    def __init__(self, db_connection, interval=SCRAPE_INTERVAL):
+        self.metrics_fn = db_connection["server_metrics_fn"]
+        self.interval = interval
+        self.rows = []
+        self.running = False
+        self.thread = None
+        self._run = None
+        self._warned = False
+
+    def attach_run(self, run_state):
+        """Реєстрація стану прогону run_workers"""
+        self._run = run_state
+
+    def start(self):
+        self.rows = []
+        self._run = None
+        self.running = True
+        self.thread = threading.Thread(target=self._collect, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.thread:
+            self.thread.join()
+
+    def _scrape(self):
+        try:
+            return self.metrics_fn()
+        except Exception as e:
+            if not self._warned:
+                print(f"⚠️ Не вдалося отримати статистику сервера: {str(e)}")
+                self._warned = True
+            return None
+
+    def _client_snapshot(self):
+        run = self._run
+        if run is None:
+            return 0, LatencyHistogram()
+        latency = LatencyHistogram()
+        for local in run["histograms"]:
+            for histogram in local.values():
+                latency.merge(histogram)
+        return sum(run["completed"]), latency
+
+    def _collect(self):
+        start = time.monotonic()
+        previous = self._scrape()
+        previous_time = start
+        previous_ops, previous_latency = self._client_snapshot()
+        while self.running:
+            time.sleep(self.interval)
+            now = time.monotonic()
+            current = self._scrape()
+            ops, latency = self._client_snapshot()
+            if ops < previous_ops:  # Почався новий прогін
+                previous_ops, previous_latency = 0, LatencyHistogram()
+            interval = latency.since(previous_latency)
+            elapsed = now - previous_time
+            row = {
+                "timestamp": time.time(),  # Та сама шкала, що й у SystemMetrics
+                "elapsed": now - start,
+                "interval": elapsed,
+                "client_ops": ops - previous_ops,
+                "client_ops_per_second": (ops - previous_ops) / elapsed if elapsed else 0,
+                **interval.summary("client_")
+            }
+            if current is not None:
+                for name, value in current["counters"].items():
+                    before = previous["counters"].get(name) if previous else None
+                    row[f"delta_{name}"] = value - before if before is not None else None
+                for name, value in current["gauges"].items():
+                    row[name] = value
+            self.rows.append(row)
+            previous = current if current is not None else previous
+            previous_time = now
+            previous_ops, previous_latency = ops, latency
+
+
+def save_server_metrics(rows, filename):
+    """Збереження інтервалів у CSV; набір метрик може відрізнятися між інтервалами"""
+    if not rows:
+        return
+    fieldnames = list(dict.fromkeys(name for row in rows for name in row))
+    with open(filename, mode="w", newline='', encoding='utf-8') as file:
+        writer = csv.DictWriter(file, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"✅ Статистику сервера збережено у файл {filename}")
@@ -0,0 +1,206 @@
+import csv
+import time
+import argparse
+import psutil
+from workers import OperationSource, run_workers
+from keyspace import KeySpace, KEY_DISTRIBUTIONS
+from docgen import DocumentGenerator
+from latency import LatencyHistogram
+from metrics_server import LiveMetrics, start_metrics_server
+from benchmark_comprehensive import (AVAILABLE_DATABASES, WORKLOAD_SCENARIOS, DOCUMENT_SIZES, THREADS,
+                                     KEY_DISTRIBUTION, MUTATION_TYPES, PRELOAD_DOCS, get_db_connection,
+                                     build_operation_handlers, scenario_mix)
+
+# Конфігурація
+SOAK_SEGMENT_OPS = 10000  # Операцій в одному сегменті між перевірками умов зупинки
+SOAK_FIRST_CHECKPOINT = 10000  # Перша контрольна точка за розміром набору; далі розмір подвоюється
+SOAK_CHECKPOINT_INTERVAL = 600  # Контрольна точка не рідше ніж раз на стільки секунд
+
+class SoakCheckpoints:
+    """Контрольні точки тривалого прогону з пам'яттю, що не залежить від тривалості.
+
+    Між точками зберігаються лише гістограма вікна та лічильники; гістограма
+    всього прогону має фіксований розмір. Кожна точка одразу дописується
+    у CSV, тому перерваний прогін зберігає всі попередні точки.
+    """
+    def __init__(self, filename, db_connection, keys, checkpoint_docs=None):
+        self.filename = filename
+        self.db_connection = db_connection
+        self.keys = keys
+        self.checkpoint_docs = checkpoint_docs
+        self.next_size = checkpoint_docs or SOAK_FIRST_CHECKPOINT
+        self.started = time.monotonic()
+        self.last_time = self.started
+        self.total_ops = 0
+        self.window_ops = 0
+        self.window_latency = LatencyHistogram()
+        self.total_latency = LatencyHistogram()
+        self.last_server = self._server_metrics()
+        self.process = psutil.Process()
+        self.writer = None
+        self.file = None
+        self.count = 0
+
+    def _server_metrics(self):
+        try:
+            return self.db_connection["server_metrics_fn"]()
+        except Exception as e:
+            print(f"⚠️ Не вдалося отримати статистику сервера: {str(e)}")
+            return None
+
+    def add_segment(self, run):
+        """Врахування завершеного сегмента run_workers"""
+        self.total_ops += run["completed_ops"]
+        self.window_ops += run["completed_ops"]
+        for histogram in run["latency"].values():
+            self.window_latency.merge(histogram)
+            self.total_latency.merge(histogram)
+
+    def due(self):
+        """Чи настав час контрольної точки за розміром набору або за часом"""
+        return (self.keys.live_count() >= self.next_size
+                or time.monotonic() - self.last_time >= SOAK_CHECKPOINT_INTERVAL)
+
+    def emit(self, reason):
+        now = time.monotonic()
+        dataset = self.keys.live_count()
+        window_time = now - self.last_time
+        row = {
+            "checkpoint": self.count,
+            "reason": reason,
+            "elapsed": now - self.started,
+            "dataset_docs": dataset,
+            "total_ops": self.total_ops,
+            "window_ops": self.window_ops,
+            "window_time": window_time,
+            "window_throughput": self.window_ops / window_time if window_time else 0,
+            "window_avg_latency": self.window_latency.mean(),
+            **self.window_latency.summary("window_"),
+            "total_p99_latency": self.total_latency.percentile(99),
+            "client_rss": self.process.memory_info().rss
+        }
+        # Резидентність кешу та приріст лічильників сервера з попередньої точки
+        server = self._server_metrics()
+        if server is not None:
+            before = self.last_server["counters"] if self.last_server else {}
+            for name, value in server["counters"].items():
+                row[f"delta_{name}"] = value - before[name] if name in before else None
+            row.update(server["gauges"])
+            self.last_server = server
+
+        if self.writer is None:
+            self.file = open(self.filename, mode="w", newline='', encoding='utf-8')
+            # Набір метрик сервера фіксується першою точкою
+            self.writer = csv.DictWriter(self.file, fieldnames=row.keys(), extrasaction="ignore")
+            self.writer.writeheader()
+        self.writer.writerow(row)
+        self.file.flush()
+
+        print(f"📍 Точка {self.count}: {dataset} документів, {row['window_throughput']:.0f} оп/с, "
+              f"p99 {row['window_p99_latency'] or 0:.4f}s")
+        self.count += 1
+        self.last_time = now
+        self.window_ops = 0
+        self.window_latency = LatencyHistogram()
+        while dataset >= self.next_size:
+            self.next_size = self.next_size + self.checkpoint_docs if self.checkpoint_docs else self.next_size * 2
+
+    def close(self):
+        if self.file:
+            self.file.close()
+
+def run_soak(db_name, scenario_name, duration=None, target_docs=None, checkpoint_docs=None,
+             doc_size=DOCUMENT_SIZES["small"], key_distribution=KEY_DISTRIBUTION, generator=None, live=None):
+    """Тривалий прогін до закінчення duration секунд або до target_docs документів
+
+    Контрольні точки зберігаються при кожному подвоєнні набору даних
+    (або кожні checkpoint_docs документів) і не рідше ніж раз на
+    SOAK_CHECKPOINT_INTERVAL секунд.
+    """
+    if duration is None and target_docs is None:
+        raise ValueError("Потрібно вказати тривалість або цільовий розмір набору даних")
+    if generator is None:
+        generator = DocumentGenerator()
+    scenario = WORKLOAD_SCENARIOS[scenario_name]
+    mix = scenario_mix(scenario)
+    if target_docs is not None and "write" not in mix:
+        raise ValueError(f"Сценарій {scenario_name} не додає документів, цільовий розмір недосяжний")
+    print(f"\n🚀 Тривалий прогін для {db_name}")
+    print(f"📊 Сценарій: {scenario_name}")
+    print(f"⏱️ Тривалість: {duration or '-'} с, цільовий розмір набору: {target_docs or '-'}")
+
+    db_connection = get_db_connection(db_name)
+    keys = KeySpace(prefix=db_name, distribution=key_distribution)
+    operations = build_operation_handlers(db_connection, keys, doc_size, generator)
+    handlers = {op_type: operations[op_type] for op_type in mix}
+    if any(op_type in MUTATION_TYPES or op_type == "read" for op_type in mix):
+        print(f"📥 Попереднє завантаження {PRELOAD_DOCS} документів...")
+        run_workers(OperationSource(PRELOAD_DOCS, {"write": 100}), {"write": operations["write"]}, THREADS)
+
+    filename = f"benchmark_soak_{db_name}_{scenario_name}_{doc_size['size']}kb.csv"
+    checkpoints = SoakCheckpoints(filename, db_connection, keys, checkpoint_docs)
+    if live is not None:
+        live.begin_cell(f"soak/{db_name}/{scenario_name}/{doc_size['description']}")
+    deadline = time.monotonic() + duration if duration else None
+    reason = "interrupted"
+    try:
+        while True:
+            if deadline is not None and time.monotonic() >= deadline:
+                reason = "duration"
+                break
+            if target_docs is not None and keys.live_count() >= target_docs:
+                reason = "target"
+                break
+            remaining = None if deadline is None else deadline - time.monotonic()
+            run = run_workers(OperationSource(SOAK_SEGMENT_OPS, mix), handlers, THREADS,
+                              timeout=remaining, live=live)
+            checkpoints.add_segment(run)
+            if checkpoints.due():
+                checkpoints.emit("checkpoint")
+    except KeyboardInterrupt:
+        print("\n⚠️ Прогін перервано, зберігаємо останню точку...")
+    finally:
+        checkpoints.emit(reason)
+        checkpoints.close()
+    print(f"\n✅ Контрольні точки збережено у файл {filename}")
+    return filename
+
+def add_soak_arguments(parser):
+    """Параметри тривалого прогону, спільні для цього модуля та main.py"""
+    parser.add_argument('--db', choices=AVAILABLE_DATABASES, required=True,
+                      help='База даних для тестування')
+    parser.add_argument('--scenario', choices=WORKLOAD_SCENARIOS.keys(), default='write_heavy',
+                      help='Сценарій навантаження')
+    parser.add_argument('--duration', type=float,
+                      help='Тривалість прогону в секундах')
+    parser.add_argument('--target-docs', type=int,
+                      help='Зупинити прогін після досягнення такого розміру набору даних')
+    parser.add_argument('--checkpoint-docs', type=int,
+                      help='Крок контрольних точок у документах (за замовчуванням розмір подвоюється)')
+    parser.add_argument('--doc-size', choices=DOCUMENT_SIZES.keys(), default='small',
+                      help='Розмір тестових документів')
+    parser.add_argument('--key-distribution', choices=KEY_DISTRIBUTIONS, default=KEY_DISTRIBUTION,
+                      help='Розподіл ключів для операцій')
+    parser.add_argument('--seed', type=int, default=42,
+                      help='Seed генератора документів')
+    parser.add_argument('--metrics-port', type=int,
+                      help='Порт локального ендпоінта /metrics у форматі OpenMetrics')
+
+def run_from_args(args):
+    live = None
+    if args.metrics_port:
+        live = LiveMetrics()
+        start_metrics_server(live, args.metrics_port)
+    return run_soak(args.db, args.scenario, args.duration, args.target_docs, args.checkpoint_docs,
+                    DOCUMENT_SIZES[args.doc_size], args.key_distribution, DocumentGenerator(seed=args.seed), live)
+
+def main():
+    parser = argparse.ArgumentParser(description='Тривалий прогін з контрольними точками за розміром набору даних')
+    add_soak_arguments(parser)
+    args = parser.parse_args()
+    if args.duration is None and args.target_docs is None:
+        parser.error("Потрібно вказати --duration або --target-docs")
+    run_from_args(args)
+
+if __name__ == "__main__":
+    main()
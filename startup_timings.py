@@ -0,0 +1,18 @@
+import time
+from contextlib import contextmanager
+
+# Час імпорту модулів, що завантажуються лише за потреби: {мітка: секунди}
+IMPORT_TIMINGS = {}
+
+
+@contextmanager
+def import_timer(label):
+    """Вимірювання часу відкладеного імпорту драйвера чи бібліотеки
+
+    Зберігається лише перший (холодний) імпорт: повторні імпорти беруться з кешу модулів.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        IMPORT_TIMINGS.setdefault(label, time.perf_counter() - started)
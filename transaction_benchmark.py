@@ -0,0 +1,164 @@
+import csv
+import time
+import argparse
+import itertools
+import threading
+from workers import OperationSource, run_workers
+from keyspace import KeySpace, KEY_DISTRIBUTIONS
+from docgen import DocumentGenerator
+from latency import LatencyHistogram
+from benchmark_comprehensive import (DOCUMENT_SIZES, THREADS, TIMEOUT, KEY_DISTRIBUTION, DURABILITY_LEVELS,
+                                     PAUSE_BETWEEN_EXPERIMENTS, get_db_connection, build_operation_handlers)
+
+# Конфігурація
+TRANSACTION_DATABASES = ["mongodb", "arangodb"]  # Бази даних з багатодокументними транзакціями
+TXN_PRELOAD_DOCS = 1000  # Документи, серед яких вибираються ключі транзакцій
+TXN_OPERATIONS = 2000  # Транзакцій в одному прогоні
+TXN_READ_SET = 2  # Документів, що лише читаються в транзакції
+TXN_WRITE_SET = 2  # Документів, що оновлюються в транзакції
+TXN_CONCURRENCY = [1, 2, 4, 8, 16]  # Кількість паралельних потоків
+
+def sample_transaction_keys(keys, read_set, write_set):
+    """Різні ключі для наборів читання та запису
+
+    Ключі вибираються за розподілом KeySpace, тому при zipfian чи latest
+    транзакції частіше перетинаються і конфліктують. Достатню кількість
+    документів перевіряє викликач.
+    """
+    needed = read_set + write_set
+    chosen = []
+    while len(chosen) < needed:
+        key = keys.sample_key()
+        if key is not None and key not in chosen:
+            chosen.append(key)
+    return chosen[:read_set], chosen[read_set:]
+
+def run_transaction_benchmark(db_name, read_set=TXN_READ_SET, write_set=TXN_WRITE_SET,
+                              concurrency=TXN_CONCURRENCY, num_ops=TXN_OPERATIONS,
+                              key_distribution=KEY_DISTRIBUTION, durability=None,
+                              doc_size=DOCUMENT_SIZES["small"], generator=None):
+    """Бенчмарк багатодокументних транзакцій зі зростанням кількості потоків"""
+    if generator is None:
+        generator = DocumentGenerator()
+    print(f"\n🚀 Запуск бенчмарку транзакцій для {db_name}")
+    print(f"📝 Транзакція: читання {read_set}, запис {write_set} документів")
+    print(f"🔑 Розподіл ключів: {key_distribution}")
+
+    db_connection = get_db_connection(db_name, durability=durability)
+    if db_connection["transaction_fn"] is None:
+        raise ValueError(f"{db_name} не підтримує багатодокументні транзакції")
+    keys = KeySpace(prefix=db_name, distribution=key_distribution)
+    operations = build_operation_handlers(db_connection, keys, doc_size, generator)
+
+    # Завантаження даних не вимірюється
+    print(f"📥 Завантаження {TXN_PRELOAD_DOCS} документів...")
+    run_workers(OperationSource(TXN_PRELOAD_DOCS, {"write": 100}), {"write": operations["write"]}, THREADS)
+    if keys.live_count() < read_set + write_set:
+        raise ValueError(f"Для транзакції потрібно {read_set + write_set} документів, "
+                         f"доступно {keys.live_count()}")
+
+    update_values = itertools.count()
+    results = []
+    for threads in concurrency:
+        print(f"\n📊 Тестування з {threads} потоками...")
+        # Набори ключів вибираються до прогону, щоб вибір не потрапляв у затримку транзакції
+        key_sets = [sample_transaction_keys(keys, read_set, write_set) for _ in range(num_ops)]
+        key_set_index = itertools.count()
+        # Гістограма фіксації та лічильник невдалих транзакцій для кожного потоку
+        thread_state = threading.local()
+        states = []
+        states_lock = threading.Lock()
+
+        def transaction():
+            state = getattr(thread_state, "state", None)
+            if state is None:
+                state = thread_state.state = {"commit": LatencyHistogram(), "failed": 0}
+                with states_lock:
+                    states.append(state)
+            read_keys, write_keys = key_sets[next(key_set_index)]
+            retries, commit_time = db_connection["transaction_fn"](read_keys, write_keys, next(update_values))
+            if commit_time is None:
+                state["failed"] += 1
+            else:
+                state["commit"].record(commit_time)
+            return retries
+
+        run = run_workers(OperationSource(num_ops, {"transaction": 100}), {"transaction": transaction},
+                          threads, timeout=TIMEOUT)
+        if run["timed_out"]:
+            print(f"⚠️ Таймаут: виконано {run['completed_ops']} транзакцій")
+
+        commit_latency = LatencyHistogram()
+        for state in states:
+            commit_latency.merge(state["commit"])
+        failed = sum(state["failed"] for state in states)
+        completed = run["completed_ops"]
+        committed = completed - failed
+        retries = run["retries"]["transaction"]
+        attempts = completed + retries
+        total_time = run["total_time"]
+
+        print(f"  {committed / total_time if total_time else 0:.1f} транзакцій/с, "
+              f"повторів {retries}, не зафіксовано {failed}")
+        results.append({
+            "database": db_name,
+            "key_distribution": key_distribution,
+            "durability": durability or next(iter(DURABILITY_LEVELS[db_name])),
+            "threads": threads,
+            "read_set": read_set,
+            "write_set": write_set,
+            "txn_documents": read_set + write_set,
+            "completed_txns": completed,
+            "committed_txns": committed,
+            "failed_txns": failed,
+            "retries": retries,
+            # Частка спроб, що завершились відкатом (конфлікт або тимчасова помилка)
+            "abort_rate": (attempts - committed) / attempts if attempts else 0,
+            "retries_per_txn": retries / completed if completed else 0,
+            "total_time": total_time,
+            "throughput": committed / total_time if total_time else 0,
+            **run["latency"]["transaction"].summary("txn_"),
+            **commit_latency.summary("commit_"),
+            "timeout_occurred": run["timed_out"]
+        })
+
+        if threads != concurrency[-1]:
+            print(f"⏳ Очікування {PAUSE_BETWEEN_EXPERIMENTS} секунд перед наступним експериментом...")
+            time.sleep(PAUSE_BETWEEN_EXPERIMENTS)
+
+    filename = f"benchmark_transactions_{db_name}_{key_distribution}_r{read_set}w{write_set}.csv"
+    with open(filename, mode="w", newline='', encoding='utf-8') as file:
+        writer = csv.DictWriter(file, fieldnames=results[0].keys())
+        writer.writeheader()
+        writer.writerows(results)
+    print(f"\n✅ Результати збережено у файл {filename}")
+    return results
+
+def add_transaction_arguments(parser):
+    """Параметри бенчмарку транзакцій, спільні для цього модуля та main.py"""
+    parser.add_argument('--db', choices=TRANSACTION_DATABASES, required=True,
+                      help='База даних для тестування')
+    parser.add_argument('--read-set', type=int, default=TXN_READ_SET,
+                      help='Кількість документів, що лише читаються в транзакції')
+    parser.add_argument('--write-set', type=int, default=TXN_WRITE_SET,
+                      help='Кількість документів, що оновлюються в транзакції')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=TXN_CONCURRENCY,
+                      help='Кількості паралельних потоків')
+    parser.add_argument('--ops', type=int, default=TXN_OPERATIONS,
+                      help='Кількість транзакцій в одному прогоні')
+    parser.add_argument('--key-distribution', choices=KEY_DISTRIBUTIONS, default=KEY_DISTRIBUTION,
+                      help='Розподіл ключів; zipfian та latest підвищують конфліктність')
+    parser.add_argument('--durability',
+                      help='Рівень надійності запису, див. DURABILITY_LEVELS')
+
+def run_from_args(args):
+    return run_transaction_benchmark(args.db, args.read_set, args.write_set, args.concurrency, args.ops,
+                                     args.key_distribution, args.durability)
+
+def main():
+    parser = argparse.ArgumentParser(description='Бенчмарк багатодокументних транзакцій')
+    add_transaction_arguments(parser)
+    run_from_args(parser.parse_args())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+import itertools
+import threading
+import time
+from latency import LatencyHistogram
+
+# Повертається обробником, якщо операцію не виконано (наприклад, немає
+# жодного ключа для читання); така операція не рахується і не вимірюється
+SKIPPED = "skipped"
+
+# Крок обходу слотів суміші операцій; взаємно простий зі 100,
+# тому кожні 100 послідовних операцій покривають усі слоти рівно один раз
+_MIX_STRIDE = 37
+
+
+class OperationSource:
+    """Спільне джерело операцій для робочих потоків.
+
+    Не створює список операцій наперед: тип операції обчислюється з її
+    порядкового номера, тому пам'ять не залежить від кількості операцій.
+    """
+    def __init__(self, total_ops, mix, offset=0):
+        self.total_ops = total_ops
+        self._counter = itertools.count()
+        self._offset = offset
+        # mix: {"write": 10, "read": 90} -> межі слотів 0..99
+        self._bounds = []
+        upper = 0
+        for op_type, pct in mix.items():
+            if pct <= 0:
+                continue
+            upper += pct
+            self._bounds.append((upper, op_type))
+        if upper != 100:
+            raise ValueError(f"Сума відсотків суміші операцій має бути 100, отримано {upper}")
+
+    def next(self):
+        """Повертає (номер, тип) наступної операції або None, якщо операції вичерпано"""
+        # next() для itertools.count атомарний під GIL, тому блокування не потрібне
+        index = next(self._counter)
+        if index >= self.total_ops:
+            return None
+        slot = (index * _MIX_STRIDE + self._offset) % 100
+        for upper, op_type in self._bounds:
+            if slot < upper:
+                return index, op_type
+
+
+def run_workers(source, handlers, threads, timeout=None, live=None):
+    """Запуск довгоживучих робочих потоків, що вибирають операції з джерела.
+
+    handlers: {тип операції: функція без аргументів}. Якщо функція повертає
+    число, воно додається до лічильника повторів цього типу операцій
+    (наприклад, повтори після конфлікту оптимістичного блокування); SKIPPED
+    означає, що операцію не виконано.
+    Повертає словник з кількістю виконаних операцій, часом, ознакою таймауту
+    та гістограмами затримок за типами операцій.
+    Таймаут діє на весь прогін: після дедлайну потоки не беруть нових операцій,
+    а прогін не чекає на операції, що ще виконуються.
+    live: необов'язковий LiveMetrics (або список спостерігачів з attach_run),
+    який читатиме стан прогону під час роботи.
+    """
+    stop = threading.Event()
+    completed = [0] * threads
+    errors = []
+    # Окремі гістограми для кожного потоку, щоб запис не потребував блокування
+    histograms = [{op_type: LatencyHistogram() for op_type in handlers} for _ in range(threads)]
+    in_flight = [0] * threads
+    retries = [{op_type: 0 for op_type in handlers} for _ in range(threads)]
+    skipped = [{op_type: 0 for op_type in handlers} for _ in range(threads)]
+    observers = live if isinstance(live, (list, tuple)) else [live]
+    for observer in observers:
+        if observer is not None:
+            observer.attach_run({"completed": completed, "histograms": histograms,
+                                 "in_flight": in_flight, "errors": errors})
+    start = time.time()
+    deadline = time.monotonic() + timeout if timeout else None
+
+    def worker(slot):
+        local = histograms[slot]
+        local_retries = retries[slot]
+        local_skipped = skipped[slot]
+        clock = time.perf_counter
+        try:
+            while not stop.is_set():
+                op = source.next()
+                if op is None:
+                    break
+                op_type = op[1]
+                in_flight[slot] = 1
+                started = clock()
+                result = handlers[op_type]()
+                elapsed = clock() - started
+                in_flight[slot] = 0
+                if result is SKIPPED:
+                    local_skipped[op_type] += 1
+                    continue
+                local[op_type].record(elapsed)
+                # Повтори повертають лише обробники змін; інші результати драйвера не враховуються
+                if isinstance(result, int) and result:
+                    local_retries[op_type] += result
+                # Кожен потік пише лише у свою комірку, тому блокування не потрібне
+                completed[slot] += 1
+        except Exception as e:
+            errors.append(e)
+            stop.set()
+
+    workers = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(threads)]
+    for w in workers:
+        w.start()
+
+    timed_out = False
+    for w in workers:
+        remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+        w.join(remaining)
+        if w.is_alive():
+            timed_out = True
+            break
+    stop.set()
+    total_time = time.time() - start
+
+    if errors:
+        raise errors[0]
+
+    latency = {op_type: LatencyHistogram() for op_type in handlers}
+    for local in histograms:
+        for op_type, histogram in local.items():
+            latency[op_type].merge(histogram)
+    total_retries = {op_type: sum(local[op_type] for local in retries) for op_type in handlers}
+    total_skipped = {op_type: sum(local[op_type] for local in skipped) for op_type in handlers}
+
+    return {
+        "completed_ops": sum(completed),
+        "total_time": total_time,
+        "timed_out": timed_out,
+        "latency": latency,
+        "retries": total_retries,
+        "skipped": total_skipped
+    }